@@ -0,0 +1,96 @@
+"""Настройки админки для таблиц, где точный подсчёт и OFFSET слишком дороги.
+"""
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+CURSOR_VAR = 'cursor'
+# До этого размера выборка считается точно, дальше — оценивается.
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimate_count(queryset):
+    """Оценивает число строк таблицы по статистике СУБД."""
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+    elif connection.vendor == 'mysql':
+        sql = (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        )
+    else:
+        # У SQLite нет статистики без ANALYZE, но первичный ключ растёт.
+        return queryset.aggregate(last=Max('pk'))['last'] or 0
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не выполняет COUNT(*) по всей большой таблице."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if estimate >= EXACT_COUNT_LIMIT:
+                return estimate
+        return queryset.order_by()[:EXACT_COUNT_LIMIT].count()
+
+
+class KeysetChangeList(ChangeList):
+    """Список объектов, который листается по первичному ключу без OFFSET.
+
+    Пока пользователь не выбрал сортировку по колонке, следующая страница
+    выбирается условием ``pk < cursor``, а не номером страницы.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        try:
+            self.cursor = int(request.GET.get(CURSOR_VAR, ''))
+        except ValueError:
+            self.cursor = None
+        self.keyset = ORDER_VAR not in request.GET
+        self.next_cursor = None
+        self.estimated = False
+        super().__init__(request, *args, **kwargs)
+        # Ссылки фильтров и сортировки ведут на первую страницу.
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(CURSOR_VAR, None)
+        return params
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.keyset and self.cursor is not None:
+            queryset = queryset.filter(pk__lt=self.cursor)
+        return queryset
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.estimated = self.result_count >= EXACT_COUNT_LIMIT
+        if self.keyset and self.multi_page:
+            results = list(self.result_list)
+            if results:
+                self.next_cursor = results[-1].pk
+
+    def next_page_url(self):
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+
+class HighVolumeAdminMixin:
+    """Список объектов без точного подсчёта строк и с листанием по ключу."""
+
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,142 @@
+"""Горячая копия базы SQLite через online backup API.
+
+Копирование файла базы требует остановить запись. ``sqlite3.backup``
+копирует страницы базы шагами по ``pages`` страниц, а между шагами
+отпускает блокировку и ждёт ``pause`` секунд: читатели и писатели сайта
+продолжают работать. Если база меняется из другого соединения, SQLite
+начинает копию заново; при частой записи помогает режим WAL или один
+шаг (``pages=-1``), который в WAL не мешает писателям.
+
+Копия пишется во временный файл рядом с целью, проверяется
+``PRAGMA integrity_check`` и сжимается потоком в gzip. Восстановление
+идёт обратным путём: архив распаковывается, проверяется и переносится
+в рабочую базу тем же backup API одним шагом, так что открытые
+соединения видят новую базу целиком, а не полузаписанный файл.
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from urllib.request import pathname2url
+
+from django.db import connections
+
+PAGES = 256
+PAUSE = 0.005
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupError(Exception):
+    """Копия не прошла проверку целостности."""
+
+
+def database_path(alias='default'):
+    settings_dict = connections[alias].settings_dict
+    if settings_dict['ENGINE'] != 'django.db.backends.sqlite3':
+        raise BackupError(f'База {alias} — не SQLite.')
+    return settings_dict['NAME']
+
+
+def check_integrity(path):
+    connection = sqlite3.connect(path)
+    try:
+        result = connection.execute('PRAGMA integrity_check').fetchone()[0]
+    except sqlite3.DatabaseError as error:
+        result = str(error)
+    finally:
+        connection.close()
+    if result != 'ok':
+        raise BackupError(f'{path}: {result}')
+
+
+def copy_database(source, target, pages=PAGES, pause=PAUSE, progress=None):
+    """Копирует базу ``source`` в ``target`` шагами по ``pages`` страниц."""
+
+    def step(status, remaining, total):
+        if progress is not None:
+            progress(remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    source_connection = sqlite3.connect(
+        f'file:{pathname2url(source)}?mode=ro', uri=True
+    )
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(
+            target_connection, pages=pages, progress=step
+        )
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+def _sha256(chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_chunks(file):
+    return iter(lambda: file.read(CHUNK_SIZE), b'')
+
+
+def _temporary_path(near):
+    handle, path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(near)), suffix='.sqlite3.tmp'
+    )
+    os.close(handle)
+    return path
+
+
+def backup(target, database=None, pages=PAGES, pause=PAUSE, progress=None):
+    """Пишет сжатую проверенную копию базы в ``target``.
+
+    Возвращает размер несжатой копии и её SHA-256.
+    """
+    database = database or database_path()
+    snapshot = _temporary_path(target)
+    archive = target + '.tmp'
+    try:
+        copy_database(database, snapshot, pages, pause, progress)
+        check_integrity(snapshot)
+        with open(snapshot, 'rb') as source, \
+                gzip.open(archive, 'wb', compresslevel=6) as compressed:
+            digest = hashlib.sha256()
+            for chunk in _read_chunks(source):
+                digest.update(chunk)
+                compressed.write(chunk)
+        with gzip.open(archive, 'rb') as written:
+            if _sha256(_read_chunks(written)) != digest.hexdigest():
+                raise BackupError(f'{target}: архив не совпал с копией')
+        size = os.path.getsize(snapshot)
+        os.replace(archive, target)
+    finally:
+        for path in (snapshot, archive):
+            if os.path.exists(path):
+                os.remove(path)
+    return size, digest.hexdigest()
+
+
+def restore(source, database=None):
+    """Заменяет содержимое базы копией из архива ``source``.
+
+    Копия переносится в базу одним шагом, одной транзакцией записи.
+    """
+    database = database or database_path()
+    snapshot = _temporary_path(database)
+    try:
+        with gzip.open(source, 'rb') as compressed, \
+                open(snapshot, 'wb') as target:
+            shutil.copyfileobj(compressed, target, CHUNK_SIZE)
+        check_integrity(snapshot)
+        # Соединения Django не должны держать старые данные.
+        connections.close_all()
+        copy_database(snapshot, database, pages=-1)
+    finally:
+        os.remove(snapshot)
+    check_integrity(database)
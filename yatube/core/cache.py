@@ -0,0 +1,340 @@
+"""Двухуровневый кэш с защитой от «лавины» пересчётов.
+
+Первый уровень (L1) — LRU в памяти процесса, второй (L2) — общий кэш
+``default``. Значения хранятся вместе с мягким сроком годности и временем
+вычисления: это позволяет обновлять их заранее (вероятностно, по XFetch)
+и отдавать устаревшую копию, пока ключ пересчитывает один запрос.
+
+Счётчики попаданий каждый процесс раз в ``STATS_PUBLISH_INTERVAL`` секунд
+добавляет к общим в L2; их выводит команда ``cache_stats``.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+# Устаревшая копия живёт в L2 дольше мягкого срока годности во столько раз.
+STALE_FACTOR = 3
+# Как долго один запрос может держать блокировку пересчёта ключа.
+LOCK_TIMEOUT = 10
+# Интервал опроса L2 запросами, которые ждут чужой пересчёт.
+WAIT_INTERVAL = 0.05
+# Коэффициент раннего обновления XFetch: больше — обновляем раньше.
+EARLY_REFRESH_BETA = 1.0
+# Размер L1 по умолчанию, если общий кэш живёт вне процесса.
+DEFAULT_L1_SIZE = 1000
+# Число полосатых блокировок для объединения запросов внутри процесса.
+LOCK_STRIPES = 64
+# Как часто процесс добавляет свои счётчики попаданий к общим.
+STATS_PUBLISH_INTERVAL = 10
+STATS_KEY = 'tiered_cache:stats'
+
+
+class Entry:
+    """Значение кэша с мягким и жёстким сроками годности."""
+
+    __slots__ = ('value', 'expires', 'hard_expires', 'delta')
+
+    def __init__(self, value, expires, hard_expires, delta):
+        self.value = value
+        self.expires = expires
+        self.hard_expires = hard_expires
+        self.delta = delta
+
+    def is_fresh(self, now):
+        return now < self.expires
+
+    def should_refresh_early(self, now, beta=EARLY_REFRESH_BETA):
+        """Решает, пора ли обновить ещё свежее значение (XFetch)."""
+        gap = -self.delta * beta * math.log(1.0 - random.random())
+        return now + gap >= self.expires
+
+    def to_tuple(self):
+        return self.value, self.expires, self.hard_expires, self.delta
+
+
+class LocalLRU:
+    """Потокобезопасный LRU-кэш в памяти процесса."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.hard_expires <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+TIERS = ('l1', 'l2')
+STATS_NAMES = (
+    'l1_hits', 'l1_misses', 'l2_hits', 'l2_misses', 'stale', 'recomputes',
+)
+
+
+def describe_stats(counts):
+    """Счётчики по именам ``STATS_NAMES`` с долей попаданий по уровням."""
+    data = {}
+    for tier in TIERS:
+        hits, misses = counts[f'{tier}_hits'], counts[f'{tier}_misses']
+        total = hits + misses
+        data[tier] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+    data['stale'] = counts['stale']
+    data['recomputes'] = counts['recomputes']
+    return data
+
+
+class TierStats:
+    """Счётчики попаданий и промахов по уровням кэша."""
+
+    TIERS = TIERS
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._unpublished = Counter()
+        self._published = time.monotonic()
+        self.reset()
+
+    def reset(self):
+        self.hits = dict.fromkeys(self.TIERS, 0)
+        self.misses = dict.fromkeys(self.TIERS, 0)
+        self.stale = 0
+        self.recomputes = 0
+
+    def record(self, tier, hit):
+        with self._lock:
+            counter = self.hits if hit else self.misses
+            counter[tier] += 1
+            self._unpublished[f'{tier}_{"hits" if hit else "misses"}'] += 1
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            self._unpublished[name] += 1
+
+    def hit_ratio(self, tier):
+        total = self.hits[tier] + self.misses[tier]
+        return self.hits[tier] / total if total else 0.0
+
+    def as_dict(self):
+        counts = {'stale': self.stale, 'recomputes': self.recomputes}
+        for tier in self.TIERS:
+            counts[f'{tier}_hits'] = self.hits[tier]
+            counts[f'{tier}_misses'] = self.misses[tier]
+        return describe_stats(counts)
+
+    def publish(self, backend, force=False):
+        """Добавляет накопленные с прошлого раза счётчики к общим."""
+        with self._lock:
+            waited = time.monotonic() - self._published
+            if not force and waited < STATS_PUBLISH_INTERVAL:
+                return
+            pending, self._unpublished = self._unpublished, Counter()
+            self._published = time.monotonic()
+        for name, value in pending.items():
+            key = f'{STATS_KEY}:{name}'
+            backend.add(key, 0, None)
+            try:
+                backend.incr(key, value)
+            except ValueError:
+                # Ключ вытеснили между add и incr: теряем одну порцию.
+                pass
+
+
+class TieredCache:
+    """LRU процесса перед общим кэшем с единственным пересчётом ключа.
+
+    Если L2 сам живёт в памяти процесса (``LocMemCache``), L1 поверх него
+    ничего не ускоряет и по умолчанию выключен.
+    """
+
+    def __init__(self, alias='default', l1_size=None):
+        self.alias = alias
+        self._l1_size = l1_size
+        self._l1 = None
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.stats = TierStats()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @property
+    def l1(self):
+        if self._l1 is None:
+            size = self._l1_size
+            if size is None:
+                size = getattr(settings, 'TIERED_CACHE_L1_SIZE', None)
+            if size is None:
+                in_process = isinstance(self.backend, LocMemCache)
+                size = 0 if in_process else DEFAULT_L1_SIZE
+            self._l1 = LocalLRU(size)
+        return self._l1
+
+    def get_or_set(self, key, compute, timeout):
+        """Возвращает значение ключа, вычисляя его не более одного раза."""
+        self.stats.publish(self.backend)
+        now = time.time()
+        entry = self._get(key, now)
+        if entry is not None and entry.is_fresh(now):
+            if not entry.should_refresh_early(now):
+                return entry.value
+        return self._recompute(key, compute, timeout, entry)
+
+    def delete(self, key):
+        self.l1.delete(key)
+        self.backend.delete(key)
+
+    def clear_local(self):
+        """Очищает только L1 текущего процесса."""
+        self.l1.clear()
+
+    def shared_stats(self):
+        """Счётчики всех процессов, опубликованные в L2."""
+        found = self.backend.get_many(
+            [f'{STATS_KEY}:{name}' for name in STATS_NAMES]
+        )
+        return describe_stats({
+            name: found.get(f'{STATS_KEY}:{name}', 0)
+            for name in STATS_NAMES
+        })
+
+    def reset_shared_stats(self):
+        self.backend.delete_many(
+            [f'{STATS_KEY}:{name}' for name in STATS_NAMES]
+        )
+
+    def _get(self, key, now):
+        entry = self.l1.get(key, now)
+        self.stats.record('l1', entry is not None)
+        if entry is not None:
+            return entry
+        entry = self._get_l2(key)
+        self.stats.record('l2', entry is not None)
+        if entry is not None:
+            self.l1.set(key, entry)
+        return entry
+
+    def _get_l2(self, key):
+        data = self.backend.get(key)
+        if data is None:
+            return None
+        try:
+            return Entry(*data)
+        except TypeError:
+            # Под ключом лежит значение в чужом формате.
+            return None
+
+    def _set(self, key, value, timeout, delta):
+        now = time.time()
+        hard_timeout = timeout * STALE_FACTOR
+        entry = Entry(value, now + timeout, now + hard_timeout, delta)
+        self.backend.set(key, entry.to_tuple(), hard_timeout)
+        self.l1.set(key, entry)
+        return entry
+
+    def _recompute(self, key, compute, timeout, stale):
+        local_lock = self._locks[hash(key) % LOCK_STRIPES]
+        # Пока есть старое значение, не ждём соседние потоки — отдаём его.
+        if stale is None:
+            acquired = local_lock.acquire(timeout=LOCK_TIMEOUT)
+        else:
+            acquired = local_lock.acquire(blocking=False)
+        if not acquired:
+            if stale is None:
+                return compute()
+            return self._serve_stale(stale)
+        try:
+            fresh = self._get_l2(key)
+            if self._is_newer(fresh, stale):
+                self.l1.set(key, fresh)
+                return fresh.value
+            return self._recompute_shared(key, compute, timeout, stale)
+        finally:
+            local_lock.release()
+
+    @staticmethod
+    def _is_newer(entry, stale):
+        """Проверяет, что ключ уже пересчитал кто-то другой."""
+        if entry is None or not entry.is_fresh(time.time()):
+            return False
+        return stale is None or entry.expires > stale.expires
+
+    def _recompute_shared(self, key, compute, timeout, stale):
+        lock_key = f'{key}:lock'
+        locked = self.backend.add(lock_key, 1, LOCK_TIMEOUT)
+        if not locked:
+            if stale is not None:
+                return self._serve_stale(stale)
+            entry = self._wait_for(key)
+            if entry is not None:
+                return entry.value
+        try:
+            started = time.time()
+            value = compute()
+            delta = time.time() - started
+            self._set(key, value, timeout, delta)
+            self.stats.incr('recomputes')
+            logger.debug(
+                'Пересчитан ключ %s за %.3f с, попадания L1 %.2f, L2 %.2f',
+                key, delta,
+                self.stats.hit_ratio('l1'), self.stats.hit_ratio('l2'),
+            )
+            return value
+        finally:
+            # Чужую блокировку не снимаем: её владелец ещё считает.
+            if locked:
+                self.backend.delete(lock_key)
+
+    def _wait_for(self, key):
+        deadline = time.time() + LOCK_TIMEOUT
+        while time.time() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry = self._get_l2(key)
+            if entry is not None:
+                self.l1.set(key, entry)
+                return entry
+        return None
+
+    def _serve_stale(self, stale):
+        self.stats.incr('stale')
+        return stale.value
+
+
+tiered_cache = TieredCache()
@@ -0,0 +1,251 @@
+import hashlib
+import logging
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import Error as DatabaseError
+from django.db import connection, connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_DEFAULTS = {
+    'TIMEOUT': 20,
+    'STALE_WHILE_REVALIDATE': 60,
+    'STALE_IF_ERROR': 60 * 60,
+}
+QUERY_BUDGET_DEFAULTS = {
+    'ENABLED': False,
+    'ACTION': 'log',
+}
+# Управление транзакциями не считается запросами к данным.
+TRANSACTION_STATEMENTS = ('BEGIN', 'SAVEPOINT', 'RELEASE', 'ROLLBACK')
+# Сколько секунд один запрос может держать фоновое обновление страницы.
+REFRESH_LOCK_TIMEOUT = 30
+
+_refresh_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix='feed-refresh'
+)
+
+
+def _feed_cache_settings():
+    return {**FEED_CACHE_DEFAULTS, **getattr(settings, 'FEED_CACHE', {})}
+
+
+# Поколение ключей страниц одной ленты: смена поколения сбрасывает копии
+# страниц этой ленты, остальные ленты не трогаются.
+FEED_GENERATION_KEY = 'feed:generation:{}'
+
+
+def invalidate_feed_cache(*feeds):
+    """Сбрасывает сохранённые страницы перечисленных лент."""
+    generation = time.time_ns()
+    cache.set_many(
+        {FEED_GENERATION_KEY.format(feed): generation for feed in feeds},
+        None,
+    )
+
+
+def _generations(feeds):
+    keys = [FEED_GENERATION_KEY.format(feed) for feed in feeds]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def _feed_keys(request, feeds):
+    """Ключ копии текущего поколения и ключ аварийной копии.
+
+    Аварийная копия для ``STALE_IF_ERROR`` хранится без поколения:
+    запись в ленту не должна лишать её запасной страницы.
+    """
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'feed:{_generations(feeds)}:{path}', f'feed:stale:{path}'
+
+
+def _store(keys, request, response, options):
+    if response.status_code != 200 or response.streaming:
+        return
+    if response.cookies or request.META.get('CSRF_COOKIE_USED'):
+        # Страница с cookie или CSRF-токеном принадлежит одному клиенту.
+        return
+    entry = {
+        'content': response.content,
+        'headers': list(response.items()),
+        'stored': time.time(),
+    }
+    key, stale_key = keys
+    lifetime = options['TIMEOUT'] + options['STALE_WHILE_REVALIDATE']
+    if lifetime:
+        cache.set(key, entry, lifetime)
+    if options['STALE_IF_ERROR']:
+        cache.set(
+            stale_key, entry, options['TIMEOUT'] + options['STALE_IF_ERROR']
+        )
+
+
+def _from_entry(entry, warning=None):
+    response = HttpResponse(entry['content'])
+    for header, value in entry['headers']:
+        response[header] = value
+    response['Age'] = int(time.time() - entry['stored'])
+    if warning:
+        response['Warning'] = warning
+    return response
+
+
+def _refresh(keys, view, request, args, kwargs, options):
+    try:
+        _store(keys, request, view(request, *args, **kwargs), options)
+    except Exception:
+        logger.exception('Не удалось обновить страницу %s', keys[0])
+    finally:
+        cache.delete(f'{keys[0]}:refresh')
+        connections.close_all()
+
+
+def _schedule_refresh(keys, view, request, args, kwargs, options):
+    if cache.add(f'{keys[0]}:refresh', 1, REFRESH_LOCK_TIMEOUT):
+        _refresh_executor.submit(
+            _refresh, keys, view, request, args, kwargs, options
+        )
+
+
+def stale_while_revalidate(feeds):
+    """Кэширует страницу ленты и отдаёт устаревшую копию при нужде.
+
+    Окна задаются настройкой ``FEED_CACHE`` по аналогии с RFC 5861:
+    свежая копия отдаётся сразу; в окне ``STALE_WHILE_REVALIDATE``
+    отдаётся устаревшая копия, а страница обновляется в фоне; в окне
+    ``STALE_IF_ERROR`` устаревшая копия заменяет ответ, если
+    представление упало с ошибкой базы данных.
+
+    ``feeds(request, *args, **kwargs)`` называет ленты, из которых
+    собрана страница; ``invalidate_feed_cache`` с любым из этих имён
+    сбрасывает её копию. Кэшируются только страницы для анонимных
+    посетителей: у пользователей на странице их подписки, лайки и
+    CSRF-токен.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            options = _feed_cache_settings()
+            keys = _feed_keys(request, feeds(request, *args, **kwargs))
+            entry = cache.get(keys[0])
+            age = time.time() - entry['stored'] if entry else None
+            if entry and age < options['TIMEOUT']:
+                return _from_entry(entry)
+            revalidate = options['TIMEOUT'] + options['STALE_WHILE_REVALIDATE']
+            if entry and age < revalidate:
+                _schedule_refresh(keys, view, request, args, kwargs, options)
+                return _from_entry(entry, '110 - "Response is Stale"')
+            try:
+                response = view(request, *args, **kwargs)
+            except DatabaseError:
+                entry = cache.get(keys[1])
+                if not entry:
+                    raise
+                logger.exception(
+                    'Ошибка базы данных, отдаём копию %s', keys[1]
+                )
+                return _from_entry(entry, '111 - "Revalidation Failed"')
+            _store(keys, request, response, options)
+            return response
+        return wrapper
+    return decorator
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше SQL-запросов, чем ему разрешено."""
+
+
+class QueryRecorder:
+    """Запоминает SQL-запросы соединения вместе со стеком вызова."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(TRANSACTION_STATEMENTS):
+            self.queries.append((sql, repr(params), self._stack()))
+        return execute(sql, params, many, context)
+
+    @staticmethod
+    def _stack():
+        return [
+            frame for frame in traceback.extract_stack()[:-2]
+            if frame.filename.startswith(settings.BASE_DIR)
+        ]
+
+    def duplicates(self):
+        counts = Counter((sql, params) for sql, params, _ in self.queries)
+        return [query for query, count in counts.items() if count > 1]
+
+    def describe(self, sql, params):
+        """Описывает последний запуск запроса вместе со стеком."""
+        for query_sql, query_params, stack in reversed(self.queries):
+            if (query_sql, query_params) == (sql, params):
+                return f'{sql} {params}\n' + ''.join(
+                    traceback.format_list(stack)
+                )
+        return sql
+
+
+def _check_budget(name, recorder, max_queries, allow_duplicates):
+    problems = []
+    if len(recorder.queries) > max_queries:
+        problems.append(
+            f'{name}: {len(recorder.queries)} SQL-запросов '
+            f'при бюджете {max_queries}:\n' + '\n'.join(
+                recorder.describe(sql, params)
+                for sql, params, _ in recorder.queries
+            )
+        )
+    if not allow_duplicates:
+        problems.extend(
+            f'{name}: повторный запрос {recorder.describe(sql, params)}'
+            for sql, params in recorder.duplicates()
+        )
+    return problems
+
+
+def query_budget(max_queries, allow_duplicates=False):
+    """Ограничивает число SQL-запросов, которые делает представление.
+
+    Проверка включается настройкой ``QUERY_BUDGET`` (в разработке и тестах)
+    и при превышении бюджета или повторе одного и того же запроса пишет
+    в лог или бросает ``QueryBudgetExceeded`` — смотря по ``ACTION``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            options = {
+                **QUERY_BUDGET_DEFAULTS,
+                **getattr(settings, 'QUERY_BUDGET', {}),
+            }
+            if not options['ENABLED']:
+                return view(request, *args, **kwargs)
+            recorder = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                response = view(request, *args, **kwargs)
+            problems = _check_budget(
+                view.__name__, recorder, max_queries, allow_duplicates
+            )
+            if problems and options['ACTION'] == 'raise':
+                raise QueryBudgetExceeded('\n'.join(problems))
+            for problem in problems:
+                logger.warning(problem)
+            return response
+        wrapper.max_queries = max_queries
+        return wrapper
+    return decorator
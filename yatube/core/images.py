@@ -0,0 +1,239 @@
+"""Адаптивные картинки: набор ширин, размеры и размытая заглушка.
+
+Для каждой картинки заранее определён набор миниатюр ``WIDTHS`` с одним
+соотношением сторон.
+
+Если у модели рядом с полем картинки ``image`` есть поля ``image_hash``
+и ``image_placeholder``, адреса миниатюр выводятся из хэша содержимого
+и размеров строковыми операциями: ``thumbs/ab/<хэш>/640x226.jpg``.
+Ни кэш, ни хранилище миниатюр sorl при выводе страницы не нужны;
+недостающий файл создаёт первый запрос к нему (``generate``) или
+команда ``generate_thumbnails``.
+
+Картинки без хэша (ещё не обработанные командой) описываются через sorl:
+адреса, размеры и заглушка хранятся в кэше, для страницы ленты все
+записи читаются одним ``cache.get_many``.
+"""
+import base64
+import hashlib
+import logging
+import re
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousOperation
+from django.core.files.base import ContentFile
+from PIL import Image, ImageFilter, ImageOps
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (320, 640, 960)
+# Соотношение сторон карточки поста: 960x339.
+ASPECT = 339 / 960
+SIZES = '(max-width: 992px) 100vw, 960px'
+PLACEHOLDER_SIZE = (16, 6)
+TIMEOUT = 30 * 24 * 60 * 60
+THUMBNAIL_DIR = 'thumbs'
+THUMBNAIL_QUALITY = 85
+THUMBNAIL_RE = re.compile(
+    r'^thumbs/(?P<prefix>[0-9a-f]{2})/(?P<hash>[0-9a-f]{40})/'
+    r'(?P<width>\d+)x(?P<height>\d+)\.jpg$'
+)
+RESPONSIVE_IMAGES_DEFAULTS = {
+    'HASHED_URLS': True,
+    # Поля ``app.Model.field``, миниатюры которых создаются по запросу.
+    'FIELDS': ('posts.Post.image',),
+}
+
+
+def _settings():
+    return {
+        **RESPONSIVE_IMAGES_DEFAULTS,
+        **getattr(settings, 'RESPONSIVE_IMAGES', {}),
+    }
+
+
+def _key(name):
+    return 'image_variants:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def _height(width):
+    return round(width * ASPECT)
+
+
+def _placeholder(file):
+    """Крошечная размытая копия картинки в виде data URI."""
+    small = ImageOps.fit(
+        Image.open(file).convert('RGB'), PLACEHOLDER_SIZE
+    ).filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    small.save(buffer, 'JPEG', quality=40)
+    data = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{data}'
+
+
+def _describe(sources, placeholder):
+    url, width, height = sources[-1]
+    return {
+        'src': url,
+        'srcset': ', '.join(f'{url} {width}w' for url, width, _ in sources),
+        'width': width,
+        'height': height,
+        'placeholder': placeholder,
+    }
+
+
+def fingerprint(file):
+    """Хэш содержимого и заглушка картинки; файл остаётся открытым."""
+    digest = hashlib.sha1()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    placeholder = _placeholder(file)
+    file.seek(0)
+    return digest.hexdigest(), placeholder
+
+
+def thumbnail_name(image_hash, width):
+    return (
+        f'{THUMBNAIL_DIR}/{image_hash[:2]}/{image_hash}/'
+        f'{width}x{_height(width)}.jpg'
+    )
+
+
+def hashed_variants(image):
+    """Описание картинки по хэшу из её строки или ``None``, если хэша нет."""
+    if not image or not _settings()['HASHED_URLS']:
+        return None
+    name = image.field.name
+    image_hash = getattr(image.instance, f'{name}_hash', '')
+    if not image_hash:
+        return None
+    sources = [
+        (image.storage.url(thumbnail_name(image_hash, width)), width,
+         _height(width))
+        for width in WIDTHS
+    ]
+    return _describe(
+        sources, getattr(image.instance, f'{name}_placeholder', '')
+    )
+
+
+def build_variants(image):
+    """Создаёт миниатюры всех ширин через sorl и описывает их."""
+    sources = []
+    for width in WIDTHS:
+        height = _height(width)
+        thumbnail = get_thumbnail(
+            image, f'{width}x{height}', crop='center', upscale=True
+        )
+        sources.append((thumbnail.url, width, height))
+    image.open()
+    try:
+        placeholder = _placeholder(image)
+    finally:
+        image.close()
+    return _describe(sources, placeholder)
+
+
+def get_variants(images):
+    """Описания картинок по именам файлов.
+
+    Картинки с хэшем описываются сразу, остальные читаются из кэша,
+    промахи дочитываются через sorl.
+    """
+    variants, names = {}, {}
+    for image in images:
+        if not image:
+            continue
+        hashed = hashed_variants(image)
+        if hashed is None:
+            names[image.name] = image
+        else:
+            variants[image.name] = hashed
+    keys = {_key(name): name for name in names}
+    found = cache.get_many(keys) if keys else {}
+    variants.update((keys[key], value) for key, value in found.items())
+    missing = {}
+    for key, name in keys.items():
+        if key in found:
+            continue
+        image = names[name]
+        try:
+            if not image.storage.exists(name):
+                # Без исходного файла sorl только зря сходит в своё
+                # хранилище ключей.
+                logger.warning('Нет файла картинки %s', name)
+                continue
+            variants[name] = missing[key] = build_variants(image)
+        except (OSError, ValueError, SuspiciousOperation):
+            logger.exception('Не удалось подготовить картинку %s', name)
+    if missing:
+        cache.set_many(missing, TIMEOUT)
+    return variants
+
+
+def _find_source(image_hash):
+    """Файл картинки с этим хэшем в одном из полей ``FIELDS``."""
+    for label in _settings()['FIELDS']:
+        model_label, field = label.rsplit('.', 1)
+        model = apps.get_model(model_label)
+        instance = model._default_manager.filter(
+            **{f'{field}_hash': image_hash}
+        ).exclude(**{field: ''}).first()
+        if instance is not None:
+            return getattr(instance, field)
+    return None
+
+
+def save_thumbnail(source, image_hash, width):
+    """Создаёт миниатюру ширины ``width``, если её ещё нет."""
+    storage = source.storage
+    name = thumbnail_name(image_hash, width)
+    if storage.exists(name):
+        return name
+    source.open()
+    try:
+        image = ImageOps.fit(
+            Image.open(source).convert('RGB'), (width, _height(width)),
+            method=Image.LANCZOS,
+        )
+    finally:
+        source.close()
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+    saved = storage.save(name, ContentFile(buffer.getvalue()))
+    if saved != name:
+        # Параллельный запрос успел сохранить ту же миниатюру.
+        storage.delete(saved)
+    return name
+
+
+def generate(path):
+    """Создаёт миниатюру по пути из ``MEDIA_ROOT``.
+
+    Возвращает ``False``, если путь не похож на миниатюру, размеры не из
+    набора или картинки с таким хэшем нет.
+    """
+    match = THUMBNAIL_RE.match(path)
+    if match is None:
+        return False
+    image_hash, width = match['hash'], int(match['width'])
+    if (
+        match['prefix'] != image_hash[:2]
+        or width not in WIDTHS
+        or int(match['height']) != _height(width)
+    ):
+        return False
+    source = _find_source(image_hash)
+    if source is None:
+        return False
+    try:
+        save_thumbnail(source, image_hash, width)
+    except (OSError, ValueError, SuspiciousOperation):
+        logger.exception('Не удалось создать миниатюру %s', path)
+        return False
+    return True
@@ -0,0 +1,202 @@
+"""Отдача загруженных файлов без ``django.views.static``.
+
+Путь проверяется и не выходит за ``MEDIA_ROOT``. Ответ поддерживает
+условные запросы (``ETag``/``Last-Modified``) и один диапазон байтов
+(``Range``). Миниатюры под ``IMMUTABLE_PREFIXES`` не меняются, поэтому
+кэшируются браузером надолго. Саму передачу файла можно поручить
+фронт-серверу: nginx — через ``X-Accel-Redirect``, Apache и lighttpd —
+через ``X-Sendfile``. Без него файл отдаёт ``FileResponse``: WSGI-сервер
+с ``wsgi.file_wrapper`` передаёт целый файл через ``sendfile()``.
+"""
+import mimetypes
+import os
+import re
+import stat as stat_module
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+MEDIA_SERVING_DEFAULTS = {
+    # Префикс internal-location nginx, например '/protected-media/'.
+    'ACCEL_REDIRECT': None,
+    # Отдавать файл заголовком X-Sendfile.
+    'SENDFILE': False,
+    'MAX_AGE': 60 * 60,
+    # Имена миниатюр зависят от исходника и размеров: файлы под этими
+    # префиксами не перезаписываются.
+    'IMMUTABLE_PREFIXES': ('cache/', 'thumbs/'),
+    'IMMUTABLE_MAX_AGE': 365 * 24 * 60 * 60,
+}
+ENCODING_TYPES = {
+    'bzip2': 'application/x-bzip',
+    'gzip': 'application/gzip',
+    'xz': 'application/x-xz',
+}
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    """Запрошенный диапазон целиком лежит за концом файла."""
+
+
+def media_settings():
+    return {**MEDIA_SERVING_DEFAULTS, **getattr(settings, 'MEDIA_SERVING', {})}
+
+
+def resolve(path, root=None):
+    """Абсолютный путь и ``stat`` обычного файла внутри ``root``
+    (по умолчанию ``MEDIA_ROOT``).
+
+    Скрытые файлы, ``..`` и пустые части пути не отдаются.
+    """
+    if any(not part or part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        full_path = safe_join(root or settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404
+    if not stat_module.S_ISREG(stat.st_mode):
+        raise Http404
+    return full_path, stat
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def cache_control(path, options):
+    if path.startswith(tuple(options['IMMUTABLE_PREFIXES'])):
+        return f'public, max-age={options["IMMUTABLE_MAX_AGE"]}, immutable'
+    return f'public, max-age={options["MAX_AGE"]}'
+
+
+def content_type(full_path):
+    guessed, encoding = mimetypes.guess_type(full_path)
+    return ENCODING_TYPES.get(encoding, guessed) or 'application/octet-stream'
+
+
+def parse_range(header, size):
+    """Диапазон ``bytes=a-b`` как ``(начало, конец)`` включительно.
+
+    ``None`` — заголовок не понят или диапазонов несколько: тогда
+    отдаётся весь файл, как разрешает RFC 7233.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    if not size:
+        # В пустом файле нет ни одного байта для диапазона.
+        raise RangeNotSatisfiable
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if not length:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def requested_range(request, stat, etag):
+    """Диапазон из ``Range`` с учётом ``If-Range``."""
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (etag, http_date(stat.st_mtime)):
+        # Файл изменился с тех пор, как клиент получил начало.
+        return None
+    return parse_range(header, stat.st_size)
+
+
+class RangeFile:
+    """Часть открытого файла длиной ``length`` с позиции ``start``.
+
+    Нет ``fileno``, поэтому сервер читает её через ``read``, а не
+    ``sendfile()`` всего файла.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def offload_response(path, full_path, options):
+    """Пустой ответ, файл в который подставит фронт-сервер, или ``None``."""
+    if options['ACCEL_REDIRECT']:
+        response = HttpResponse(content_type=content_type(full_path))
+        response['X-Accel-Redirect'] = (
+            options['ACCEL_REDIRECT'].rstrip('/') + '/' + quote(path)
+        )
+        return response
+    if options['SENDFILE']:
+        response = HttpResponse(content_type=content_type(full_path))
+        response['X-Sendfile'] = quote(full_path)
+        return response
+    return None
+
+
+def file_response(request, full_path, stat, etag):
+    """Ответ с файлом или запрошенным диапазоном байтов."""
+    size = stat.st_size
+    try:
+        byte_range = requested_range(request, stat, etag)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    mime_type = content_type(full_path)
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=mime_type)
+        response['Content-Length'] = size
+    elif byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=mime_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(open(full_path, 'rb'), start, end - start + 1),
+            status=206, content_type=mime_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve(request, path, full_path, stat, options):
+    """Ответ на запрос уже найденного файла: 304, передача фронт-серверу
+    или сам файл."""
+    etag = file_etag(stat)
+    response = (
+        get_conditional_response(
+            request, etag=etag, last_modified=int(stat.st_mtime)
+        )
+        or offload_response(path, full_path, options)
+        or file_response(request, full_path, stat, etag)
+    )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control(path, options)
+    return response
@@ -0,0 +1,33 @@
+from django import template
+from django.utils.html import format_html
+
+from core.images import SIZES, get_variants
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_images(context, objects, field='image'):
+    """Готовит картинки всех объектов страницы одним чтением из кэша."""
+    images = [getattr(obj, field) for obj in objects]
+    context['image_variants'] = get_variants(images)
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def responsive_image(context, image, css_class='card-img my-2', alt=''):
+    """Выводит ``<img>`` с ``srcset``, размерами и ленивой загрузкой."""
+    if not image:
+        return ''
+    variants = context.get('image_variants', {}).get(image.name)
+    if variants is None:
+        variants = get_variants([image]).get(image.name)
+    if variants is None:
+        return ''
+    return format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" '
+        'height="{}" loading="lazy" decoding="async" alt="{}" '
+        'style="background-size: cover; background-image: url({})">',
+        css_class, variants['src'], variants['srcset'], SIZES,
+        variants['width'], variants['height'], alt, variants['placeholder'],
+    )
@@ -0,0 +1,51 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache import tiered_cache
+
+register = template.Library()
+
+
+class TieredCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.expire_time_var = expire_time_var
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            expire_time = int(self.expire_time_var.resolve(context))
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                '"tiered_cache" принимает только целый таймаут'
+            )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        cache_key = make_template_fragment_key(self.fragment_name, vary_on)
+        return tiered_cache.get_or_set(
+            cache_key,
+            lambda: self.nodelist.render(context),
+            expire_time,
+        )
+
+
+@register.tag('tiered_cache')
+def do_tiered_cache(parser, token):
+    """Кэширует фрагмент шаблона в двухуровневом кэше.
+
+    Синтаксис совпадает с ``{% cache %}``:
+    ``{% tiered_cache 20 index_page page_obj.number %}``.
+    """
+    nodelist = parser.parse(('endtiered_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]} требует как минимум два аргумента'
+        )
+    return TieredCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(t) for t in tokens[3:]],
+    )
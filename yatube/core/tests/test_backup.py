@@ -0,0 +1,61 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.backup import BackupError, backup, check_integrity, restore
+
+
+class BackupTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.database = os.path.join(self.directory, 'db.sqlite3')
+        self.archive = os.path.join(self.directory, 'backup.sqlite3.gz')
+        self.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT)',
+            'INSERT INTO post (text) SELECT hex(randomblob(100)) FROM '
+            '(WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 '
+            'FROM n WHERE i < 2000) SELECT i FROM n)',
+        )
+
+    def execute(self, *statements):
+        connection = sqlite3.connect(self.database)
+        with connection:
+            for statement in statements:
+                connection.execute(statement)
+        connection.close()
+
+    def count(self):
+        connection = sqlite3.connect(self.database)
+        try:
+            query = connection.execute('SELECT count(*) FROM post')
+            return query.fetchone()[0]
+        finally:
+            connection.close()
+
+    def test_backup_and_restore(self):
+        """Копия шагами восстанавливается поверх изменённой базы."""
+        steps = []
+        backup(self.archive, self.database, pages=2, pause=0,
+               progress=lambda remaining, total: steps.append(remaining))
+        self.assertGreater(len(steps), 1)
+        with gzip.open(self.archive) as archive:
+            self.assertTrue(archive.read(16).startswith(b'SQLite format 3'))
+        self.execute('DELETE FROM post')
+        restore(self.archive, self.database)
+        self.assertEqual(self.count(), 2000)
+        # Временные файлы убраны.
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['backup.sqlite3.gz', 'db.sqlite3'])
+
+    def test_corrupt_archive_not_restored(self):
+        with gzip.open(self.archive, 'wb') as archive:
+            archive.write(b'not a database')
+        with self.assertRaises(BackupError):
+            restore(self.archive, self.database)
+        check_integrity(self.database)
+        self.assertEqual(self.count(), 2000)
@@ -0,0 +1,112 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.cache import TieredCache
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tiered = TieredCache(l1_size=10)
+
+    def test_second_read_hits_l1(self):
+        """Повторное чтение обслуживает LRU процесса."""
+        self.tiered.get_or_set('key', lambda: 'value', 60)
+        self.assertEqual(self.tiered.get_or_set('key', lambda: 'new', 60),
+                         'value')
+        self.assertEqual(self.tiered.stats.hits['l1'], 1)
+        self.assertEqual(self.tiered.stats.misses['l2'], 1)
+
+    def test_l2_hit_fills_l1(self):
+        """Значение из общего кэша попадает в LRU процесса."""
+        TieredCache(l1_size=10).get_or_set('key', lambda: 'value', 60)
+        self.assertEqual(self.tiered.get_or_set('key', lambda: 'new', 60),
+                         'value')
+        self.assertEqual(self.tiered.stats.hits['l2'], 1)
+        self.assertEqual(self.tiered.get_or_set('key', lambda: 'new', 60),
+                         'value')
+        self.assertEqual(self.tiered.stats.hits['l1'], 1)
+
+    def test_l1_disabled_for_locmem(self):
+        """Перед LocMemCache LRU процесса не нужен."""
+        self.assertEqual(TieredCache().l1.max_entries, 0)
+
+    def test_stale_value_while_other_recomputes(self):
+        """Пока ключ пересчитывает другой запрос, отдаётся старая копия."""
+        self.tiered.get_or_set('key', lambda: 'old', 1)
+        self.tiered.clear_local()
+        cache.set('key:lock', 1)
+        time.sleep(1.1)
+        self.assertEqual(self.tiered.get_or_set('key', lambda: 'new', 1),
+                         'old')
+        self.assertEqual(self.tiered.stats.stale, 1)
+
+    def test_missing_key_computed_once(self):
+        """Отсутствующий ключ вычисляет только один из запросов."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.tiered.get_or_set('key', compute, 60)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+
+    def test_early_refresh(self):
+        """Дорогое значение обновляется до истечения срока годности."""
+        self.tiered.get_or_set('key', lambda: 'old', 60)
+        entry = self.tiered.l1.get('key', time.time())
+        entry.delta = 10 ** 6
+        self.assertEqual(self.tiered.get_or_set('key', lambda: 'new', 60),
+                         'new')
+
+    def test_foreign_lock_kept(self):
+        """Не дождавшись чужого пересчёта, запрос не снимает чужую
+        блокировку."""
+        cache.set('key:lock', 'other')
+        with mock.patch('core.cache.LOCK_TIMEOUT', 0.1):
+            self.assertEqual(
+                self.tiered.get_or_set('key', lambda: 'value', 60), 'value'
+            )
+        self.assertEqual(cache.get('key:lock'), 'other')
+
+    def test_shared_stats(self):
+        """Счётчики процессов складываются в общем кэше."""
+        other = TieredCache(l1_size=10)
+        self.tiered.get_or_set('key', lambda: 'value', 60)
+        self.tiered.get_or_set('key', lambda: 'value', 60)
+        other.get_or_set('key', lambda: 'value', 60)
+        self.tiered.stats.publish(cache, force=True)
+        other.stats.publish(cache, force=True)
+        stats = self.tiered.shared_stats()
+        self.assertEqual(stats['l1']['hits'], 1)
+        self.assertEqual(stats['l2']['hits'], 1)
+        self.assertEqual(stats['l2']['misses'], 1)
+        self.assertEqual(stats['recomputes'], 1)
+        out = StringIO()
+        with mock.patch('posts.management.commands.cache_stats.tiered_cache',
+                        self.tiered):
+            call_command('cache_stats', reset=True, stdout=out)
+        self.assertIn('l2: попаданий 1, промахов 1, доля попаданий 50.00%',
+                      out.getvalue())
+        self.assertEqual(self.tiered.shared_stats()['l2']['hits'], 0)
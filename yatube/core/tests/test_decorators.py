@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.decorators import QueryBudgetExceeded, query_budget
+
+User = get_user_model()
+
+
+@query_budget(1)
+def one_query_view(request):
+    User.objects.filter(username='first').exists()
+    return HttpResponse()
+
+
+@query_budget(2)
+def duplicate_query_view(request):
+    User.objects.count()
+    User.objects.count()
+    return HttpResponse()
+
+
+@query_budget(1)
+def greedy_view(request):
+    User.objects.filter(username='first').exists()
+    User.objects.filter(username='second').exists()
+    return HttpResponse()
+
+
+@override_settings(QUERY_BUDGET={'ENABLED': True, 'ACTION': 'raise'})
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    def test_within_budget(self):
+        """Представление в пределах бюджета отрабатывает как обычно."""
+        self.assertEqual(one_query_view(self.request).status_code, 200)
+
+    def test_over_budget(self):
+        """Превышение бюджета останавливает запрос со стеком вызова."""
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'greedy_view'):
+            greedy_view(self.request)
+
+    def test_duplicate_queries(self):
+        """Повтор одного и того же запроса тоже считается нарушением."""
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'test_decorators'):
+            duplicate_query_view(self.request)
+
+    @override_settings(QUERY_BUDGET={'ENABLED': True, 'ACTION': 'log'})
+    def test_log_action(self):
+        """В режиме журнала нарушение пишется в лог."""
+        with self.assertLogs('core.decorators', 'WARNING'):
+            self.assertEqual(greedy_view(self.request).status_code, 200)
+
+    @override_settings(QUERY_BUDGET={'ENABLED': False})
+    def test_disabled(self):
+        """Выключенная проверка ничего не считает."""
+        self.assertEqual(greedy_view(self.request).status_code, 200)
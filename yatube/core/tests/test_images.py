@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+from core import images
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ResponsiveImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(
+                author=author,
+                text=f'Пост {number}',
+                image=SimpleUploadedFile(f'small{number}.gif', SMALL_GIF,
+                                         content_type='image/gif'),
+            )
+            for number in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, source, **context):
+        return Template('{% load images %}' + source).render(Context(context))
+
+    def test_img_attributes(self):
+        """Картинка выводится с srcset, размерами и ленивой загрузкой."""
+        html = self.render('{% responsive_image post.image %}',
+                           post=self.posts[0])
+        for width in images.WIDTHS:
+            self.assertIn(f' {width}w', html)
+        self.assertIn('width="960" height="339"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('data:image/jpeg;base64,', html)
+
+    def test_hashed_urls_without_lookups(self):
+        """Адреса миниатюр строятся из хэша без обращений к кэшу."""
+        post = self.posts[0]
+        with mock.patch.object(images.cache, 'get_many') as get_many, \
+                mock.patch.object(images, 'build_variants') as build:
+            html = self.render('{% responsive_image post.image %}',
+                               post=post)
+        get_many.assert_not_called()
+        build.assert_not_called()
+        self.assertEqual(len(post.image_hash), 40)
+        self.assertIn(f'/media/thumbs/{post.image_hash[:2]}/'
+                      f'{post.image_hash}/640x226.jpg 640w', html)
+
+    def test_thumbnail_generated_on_request(self):
+        """Первый запрос к миниатюре создаёт её."""
+        name = images.thumbnail_name(self.posts[1].image_hash, 320)
+        response = self.client.get('/media/' + name)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name))
+        )
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_unknown_thumbnail_not_generated(self):
+        """Чужой хэш и размеры не из набора дают 404."""
+        image_hash = self.posts[1].image_hash
+        for name in (images.thumbnail_name('0' * 40, 320),
+                     f'thumbs/{image_hash[:2]}/{image_hash}/100x35.jpg'):
+            with self.subTest(name=name):
+                response = self.client.get('/media/' + name)
+                self.assertEqual(response.status_code, 404)
+
+    def test_generate_thumbnails_command(self):
+        """Команда досчитывает хэши и создаёт все миниатюры."""
+        post = self.posts[2]
+        Post.objects.filter(pk=post.pk).update(image_hash='')
+        call_command('generate_thumbnails', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(len(post.image_hash), 40)
+        for width in images.WIDTHS:
+            self.assertTrue(os.path.exists(os.path.join(
+                TEMP_MEDIA_ROOT, images.thumbnail_name(post.image_hash, width)
+            )))
+
+    @override_settings(RESPONSIVE_IMAGES={'HASHED_URLS': False})
+    def test_page_prefetched_in_one_lookup(self):
+        """Без хэшей вся страница читается из кэша одним get_many."""
+        source = (
+            '{% prefetch_images posts %}'
+            '{% for post in posts %}{% responsive_image post.image %}'
+            '{% endfor %}'
+        )
+        self.render(source, posts=self.posts)
+        with mock.patch.object(images, 'build_variants') as build, \
+                mock.patch.object(images.cache, 'get_many',
+                                  wraps=images.cache.get_many) as get_many:
+            html = self.render(source, posts=self.posts)
+        build.assert_not_called()
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(html.count('<img'), 3)
+
+    def test_empty_image(self):
+        """Пост без картинки ничего не выводит."""
+        post = Post(text='Без картинки')
+        self.assertEqual(
+            self.render('{% responsive_image post.image %}', post=post), ''
+        )
+
+    @override_settings(RESPONSIVE_IMAGES={'HASHED_URLS': False})
+    def test_missing_file_skips_sorl(self):
+        """Картинку без файла sorl не описывает."""
+        post = Post(text='Файл удалён', image='posts/missing.gif')
+        with mock.patch.object(images, 'build_variants') as build:
+            html = self.render('{% responsive_image post.image %}',
+                               post=post)
+        build.assert_not_called()
+        self.assertEqual(html, '')
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ServeMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+        for name in ('posts/file.jpg', 'cache/thumb.jpg', '.secret'):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+        open(os.path.join(TEMP_MEDIA_ROOT, 'posts/empty.jpg'), 'wb').close()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_file(self):
+        """Файл отдаётся целиком с валидаторами и типом."""
+        response = self.client.get('/media/posts/file.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_thumbnails_are_immutable(self):
+        response = self.client.get('/media/cache/thumb.jpg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_not_modified(self):
+        etag = self.client.get('/media/posts/file.jpg')['ETag']
+        response = self.client.get(
+            '/media/posts/file.jpg', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_range(self):
+        """Диапазоны: обычный, с конца и за пределами файла."""
+        cases = {
+            'bytes=10-19': (206, CONTENT[10:20], 'bytes 10-19/1024'),
+            'bytes=-5': (206, CONTENT[-5:], 'bytes 1019-1023/1024'),
+            'bytes=1000-': (206, CONTENT[1000:], 'bytes 1000-1023/1024'),
+        }
+        for header, (status, body, content_range) in cases.items():
+            with self.subTest(header=header):
+                response = self.client.get(
+                    '/media/posts/file.jpg', HTTP_RANGE=header
+                )
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(b''.join(response.streaming_content), body)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(int(response['Content-Length']), len(body))
+        response = self.client.get(
+            '/media/posts/file.jpg', HTTP_RANGE='bytes=5000-'
+        )
+        self.assertEqual(response.status_code, 416)
+
+    def test_range_of_empty_file(self):
+        """У пустого файла любой диапазон, даже с конца, не выполним."""
+        for header in ('bytes=-5', 'bytes=0-'):
+            with self.subTest(header=header):
+                response = self.client.get(
+                    '/media/posts/empty.jpg', HTTP_RANGE=header
+                )
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */0')
+
+    def test_stale_if_range_returns_full_file(self):
+        response = self.client.get(
+            '/media/posts/file.jpg', HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='"old"',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_bad_paths(self):
+        """Скрытые файлы, каталоги и выход за MEDIA_ROOT не отдаются."""
+        for path in ('.secret', 'posts/', '../manage.py', 'posts/missing'):
+            with self.subTest(path=path):
+                response = self.client.get('/media/' + path)
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(MEDIA_SERVING={'ACCEL_REDIRECT': '/protected/'})
+    def test_accel_redirect(self):
+        """Передачу файла берёт на себя nginx."""
+        response = self.client.get('/media/posts/file.jpg')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected/posts/file.jpg')
+        self.assertEqual(response.content, b'')
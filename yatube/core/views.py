@@ -1,4 +1,8 @@
+from django.http import Http404
 from django.shortcuts import render
+from django.views.decorators.http import require_safe
+
+from core import images, media
 
 
 def page_not_found(request, exception):
@@ -15,3 +19,20 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдаёт загруженный файл с заголовками кэширования и диапазонами.
+
+    Недостающую миниатюру создаёт здесь же.
+    """
+    try:
+        full_path, stat = media.resolve(path)
+    except Http404:
+        if not images.generate(path):
+            raise
+        full_path, stat = media.resolve(path)
+    return media.serve(
+        request, path, full_path, stat, media.media_settings()
+    )
@@ -1,15 +1,75 @@
 from django.contrib import admin
-from posts.models import Post, Group
+from django.contrib.auth.admin import UserAdmin
+from core.admin import HighVolumeAdminMixin
+from posts.deletion import schedule_deletion
+from posts.models import Follow, Post, Group, User
 
 
-class PostAdmin(admin.ModelAdmin):
+def schedule_deletion_action(modeladmin, request, queryset):
+    for obj in queryset:
+        schedule_deletion(obj)
+    modeladmin.message_user(
+        request, f'Поставлено в очередь на удаление: {len(queryset)}'
+    )
+
+
+schedule_deletion_action.short_description = 'Удалить в фоне'
+
+
+class BackgroundDeletionMixin:
+    """Удаление из админки только через очередь ``schedule_deletion``.
+
+    Обычное удаление каскадом загрузило бы все зависимые записи в одной
+    транзакции.
+    """
+
+    actions = (schedule_deletion_action,)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj)
+
+
+class PostAdmin(BackgroundDeletionMixin, HighVolumeAdminMixin,
+                admin.ModelAdmin):
     list_display = ('pk', 'text',
                     'pub_date', 'author', 'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
 
 
+class GroupAdmin(BackgroundDeletionMixin, admin.ModelAdmin):
+    search_fields = ('title', 'slug')
+
+
+class FollowAdmin(HighVolumeAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author', 'created')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    # Точное совпадение, чтобы поиск шёл по индексу, а не LIKE.
+    search_fields = ('=user__username', '=author__username')
+    empty_value_display = '-пусто-'
+
+
+class BackgroundDeletionUserAdmin(BackgroundDeletionMixin, UserAdmin):
+    pass
+
+
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeletionUserAdmin)
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+User = get_user_model()
+
+
+class FeedMarkerBackend(ModelBackend):
+    """Загружает пользователя сессии вместе с маркером его ленты.
+
+    Счётчик непрочитанных выводится на каждой странице, и так он не стоит
+    отдельного запроса.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = User._default_manager.select_related(
+                'feed_marker'
+            ).get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,27 @@
+from functools import lru_cache
+
+from django.utils.functional import SimpleLazyObject
+
+from posts.unread import UNREAD_CAP, unread_count
+
+
+def unread(request):
+    """Число непрочитанных постов избранных авторов.
+
+    Маркер загружается вместе с пользователем (``FeedMarkerBackend``),
+    отдельного запроса к базе нет.
+    """
+    if not request.user.is_authenticated:
+        return {}
+
+    @lru_cache(maxsize=None)
+    def count():
+        return unread_count(request.user)
+
+    return {
+        'follow_unread': SimpleLazyObject(count),
+        # Ленивый объект не сравнивается с числом в шаблоне.
+        'follow_unread_capped': SimpleLazyObject(
+            lambda: count() >= UNREAD_CAP
+        ),
+    }
@@ -0,0 +1,125 @@
+"""Счётчик просмотров постов с отложенной записью в базу.
+
+Просмотр только увеличивает счётчик в памяти процесса. Накопленные
+приращения записываются в ``Post.views`` после ответа на запрос, не чаще
+раза в ``FLUSH_INTERVAL`` секунд или когда в буфере набралось
+``MAX_PENDING`` постов: одним UPDATE на каждое значение приращения.
+
+Буфер сбрасывается и при штатном завершении процесса (``atexit``), так
+что просмотры теряются только при аварийной остановке: не больше, чем
+накопилось за ``FLUSH_INTERVAL``, и не больше ``MAX_PENDING`` постов.
+Если база за время жизни процесса сменилась (тестовая база удалена),
+буфер при выходе отбрасывается, а не пишется в чужую базу.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db import Error as DatabaseError
+from django.db.models import F
+
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+POST_VIEWS_DEFAULTS = {
+    'FLUSH_INTERVAL': 10,
+    'MAX_PENDING': 1000,
+}
+# Не больше стольких id в одном ``IN``: у SQLite есть предел параметров.
+UPDATE_CHUNK = 500
+
+
+def _options():
+    return {**POST_VIEWS_DEFAULTS, **getattr(settings, 'POST_VIEWS', {})}
+
+
+class ViewBuffer:
+    """Приращения просмотров, ещё не записанные в базу."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._last_flush = time.monotonic()
+        self.database = None
+
+    def add(self, post_id):
+        """Учитывает просмотр и возвращает число незаписанных просмотров."""
+        with self._lock:
+            if not self._pending:
+                self.database = _database_name()
+            self._pending[post_id] += 1
+            return self._pending[post_id]
+
+    def pending(self, post_id):
+        with self._lock:
+            return self._pending[post_id]
+
+    def pending_total(self):
+        with self._lock:
+            return sum(self._pending.values())
+
+    def is_due(self):
+        options = _options()
+        with self._lock:
+            if not self._pending:
+                return False
+            waited = time.monotonic() - self._last_flush
+            return (
+                len(self._pending) >= options['MAX_PENDING']
+                or waited >= options['FLUSH_INTERVAL']
+            )
+
+    def flush(self):
+        """Записывает приращения в базу и возвращает число просмотров."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        by_delta = defaultdict(list)
+        for post_id, delta in pending.items():
+            by_delta[delta].append(post_id)
+        try:
+            for delta, ids in by_delta.items():
+                for start in range(0, len(ids), UPDATE_CHUNK):
+                    Post.objects.filter(
+                        pk__in=ids[start:start + UPDATE_CHUNK]
+                    ).update(views=F('views') + delta)
+        except DatabaseError:
+            logger.exception('Не удалось записать просмотры постов')
+            with self._lock:
+                self._pending.update(pending)
+            return 0
+        return sum(pending.values())
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+
+def _database_name():
+    return connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+
+
+view_buffer = ViewBuffer()
+
+
+def record_view(post):
+    """Учитывает просмотр и проставляет посту ``view_count``."""
+    post.view_count = post.views + view_buffer.add(post.pk)
+
+
+def flush_if_due(**kwargs):
+    if view_buffer.is_due():
+        view_buffer.flush()
+
+
+def flush_at_exit():
+    """Сбрасывает буфер при завершении процесса, если база та же."""
+    if view_buffer.database != _database_name():
+        view_buffer.clear()
+        return
+    if view_buffer.pending_total():
+        view_buffer.flush()
@@ -0,0 +1,157 @@
+"""Удаление пользователей, групп и постов небольшими пачками.
+
+Каскадное удаление Django загружает все зависимые записи в память и
+держит одну длинную транзакцию. Вместо этого объект сразу скрывается из
+лент, а зависимые записи удаляет фоновый обработчик короткими
+транзакциями по ``batch_size`` строк.
+"""
+import time
+
+from django.db import transaction
+
+from posts import feed_cache, feed_updates, months
+from posts.models import (
+    Comment, DeletionTask, FeedMarker, Follow, Group, GroupSubscription,
+    Like, LikeCounter, Mention, PendingUserDeletion, Post, PostTag,
+    Recommendation, TrendingScore, User
+)
+
+BATCH_SIZE = 500
+
+
+def schedule_deletion(obj):
+    """Скрывает объект из лент и ставит его удаление в очередь."""
+    with transaction.atomic():
+        if isinstance(obj, Post):
+            kind = DeletionTask.POST
+            Post.objects.filter(pk=obj.pk).update(pending_deletion=True)
+        elif isinstance(obj, Group):
+            kind = DeletionTask.GROUP
+            Group.objects.filter(pk=obj.pk).update(pending_deletion=True)
+        elif isinstance(obj, User):
+            kind = DeletionTask.USER
+            PendingUserDeletion.objects.get_or_create(user_id=obj.pk)
+        else:
+            raise TypeError(f'Нельзя отложенно удалить {obj!r}')
+        DeletionTask.objects.get_or_create(kind=kind, object_id=obj.pk)
+    _hidden(obj)
+
+
+def _hidden(obj):
+    """Сбрасывает кэши, где скрытый объект ещё виден."""
+    if isinstance(obj, Post):
+        feeds = {'group_ids': {obj.group_id}, 'author_ids': {obj.author_id}}
+        feed_cache.invalidate_post(obj)
+    elif isinstance(obj, Group):
+        feeds = {'group_ids': {obj.pk}}
+        feed_cache.invalidate_group(obj)
+    else:
+        feeds = {'author_ids': {obj.pk}}
+        feed_cache.invalidate_author(obj.username)
+    feed_updates.invalidate(**feeds)
+    months.invalidate(**feeds)
+
+
+def delete_in_batches(queryset, batch_size=BATCH_SIZE, pause=0):
+    """Удаляет строки выборки пачками, каждую в своей транзакции."""
+    model = queryset.model
+    while True:
+        ids = list(
+            queryset.order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        with transaction.atomic():
+            model.objects.filter(pk__in=ids).delete()
+        time.sleep(pause)
+
+
+def detach_in_batches(queryset, batch_size=BATCH_SIZE, pause=0, **values):
+    """Обновляет строки выборки пачками, пока они в неё попадают."""
+    model = queryset.model
+    while True:
+        ids = list(
+            queryset.order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        model.objects.filter(pk__in=ids).update(**values)
+        time.sleep(pause)
+
+
+def _post_steps(post_id):
+    yield Comment.objects.filter(post_id=post_id)
+    yield Like.objects.filter(post_id=post_id)
+    yield LikeCounter.objects.filter(post_id=post_id)
+    yield PostTag.objects.filter(post_id=post_id)
+    yield Mention.objects.filter(post_id=post_id)
+    yield TrendingScore.objects.filter(post_id=post_id)
+    yield Post.objects.filter(pk=post_id)
+
+
+def _group_steps(group_id):
+    yield GroupSubscription.objects.filter(group_id=group_id)
+    yield Group.objects.filter(pk=group_id)
+
+
+def _user_steps(user_id):
+    yield Comment.objects.filter(author_id=user_id)
+    yield Follow.objects.filter(user_id=user_id)
+    yield Follow.objects.filter(author_id=user_id)
+    yield GroupSubscription.objects.filter(user_id=user_id)
+    yield Mention.objects.filter(user_id=user_id)
+    yield Recommendation.objects.filter(user_id=user_id)
+    yield Recommendation.objects.filter(candidate_id=user_id)
+    yield FeedMarker.objects.filter(user_id=user_id)
+    # Счётчики лайков чужих постов поправит команда reconcile_likes.
+    yield Like.objects.filter(user_id=user_id)
+    yield Comment.objects.filter(post__author_id=user_id)
+    yield Like.objects.filter(post__author_id=user_id)
+    yield LikeCounter.objects.filter(post__author_id=user_id)
+    yield PostTag.objects.filter(post__author_id=user_id)
+    yield Mention.objects.filter(post__author_id=user_id)
+    yield TrendingScore.objects.filter(post__author_id=user_id)
+    yield Post.objects.filter(author_id=user_id)
+    # Зависимых строк не осталось: каскад удалит только отметку
+    # PendingUserDeletion.
+    yield User.objects.filter(pk=user_id)
+
+
+STEPS = {
+    DeletionTask.POST: _post_steps,
+    DeletionTask.GROUP: _group_steps,
+    DeletionTask.USER: _user_steps,
+}
+
+
+def _detach_group(group_id, batch_size, pause):
+    """Оставляет посты группы, как и при SET_NULL, но без группы.
+
+    ``update()`` обходит сигналы постов, поэтому оценки трендов и кэши
+    лент поправляются здесь же.
+    """
+    for queryset in (Post.objects.filter(group_id=group_id),
+                     TrendingScore.objects.filter(group_id=group_id)):
+        detach_in_batches(queryset, batch_size, pause, group=None)
+    months.invalidate(group_ids={group_id})
+    feed_updates.invalidate(group_ids={group_id})
+    group = Group.objects.filter(pk=group_id).first()
+    if group is not None:
+        feed_cache.invalidate_group(group)
+
+
+def process_task(task, batch_size=BATCH_SIZE, pause=0):
+    if task.kind == DeletionTask.GROUP:
+        _detach_group(task.object_id, batch_size, pause)
+    for queryset in STEPS[task.kind](task.object_id):
+        delete_in_batches(queryset, batch_size, pause)
+    task.delete()
+
+
+def process_pending(batch_size=BATCH_SIZE, pause=0):
+    """Выполняет все задачи очереди и возвращает их число."""
+    done = 0
+    for task in DeletionTask.objects.all():
+        process_task(task, batch_size, pause)
+        done += 1
+    return done
@@ -0,0 +1,71 @@
+"""Имена лент, по которым сбрасываются копии страниц для гостей.
+
+Страница ленты называет свои ленты (главная, группа, автор), а запись
+поста сбрасывает только ленты, в которых пост показан. Лайки и подписки
+страницы гостей не сбрасывают: счётчики на них отстают не дольше
+``FEED_CACHE['TIMEOUT']``.
+"""
+from core.decorators import invalidate_feed_cache
+from posts.models import Group, Post
+
+INDEX = 'index'
+
+
+def group_feed(slug):
+    return f'group:{slug}'
+
+
+def profile_feed(username):
+    return f'profile:{username}'
+
+
+def index_feeds(request):
+    return [INDEX]
+
+
+def group_feeds(request, slug):
+    return [group_feed(slug)]
+
+
+def profile_feeds(request, username):
+    return [profile_feed(username)]
+
+
+def fragment_feeds(request):
+    feed = request.GET.get('feed', 'index')
+    key = request.GET.get('key', '')
+    if feed == 'group':
+        return [group_feed(key)]
+    if feed == 'profile':
+        return [profile_feed(key)]
+    return [INDEX]
+
+
+def _group_slugs(group_ids, known=None):
+    slugs = {known.pk: known.slug} if known is not None else {}
+    missing = set(group_ids) - set(slugs) - {None}
+    if missing:
+        slugs.update(
+            Group.objects.filter(pk__in=missing).values_list('pk', 'slug')
+        )
+    return [slugs[pk] for pk in group_ids if pk in slugs]
+
+
+def invalidate_post(post, group_ids=()):
+    """Сбрасывает ленты, где показан пост: главную, автора и группы."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    # Автор и группа обычно уже загружены: формы и сигналы их передают.
+    known = post.group if Post.group.field.is_cached(post) else None
+    invalidate_feed_cache(
+        INDEX,
+        profile_feed(post.author.username),
+        *map(group_feed, _group_slugs(group_ids, known)),
+    )
+
+
+def invalidate_group(group):
+    invalidate_feed_cache(INDEX, group_feed(group.slug))
+
+
+def invalidate_author(username):
+    invalidate_feed_cache(INDEX, profile_feed(username))
@@ -0,0 +1,115 @@
+"""Сколько новых постов появилось в ленте с тех пор, как её загрузили.
+
+Для каждой ленты (главная, группа, автор) в кэше лежат id последних
+``RECENT`` постов по возрастанию, так что ответ на вопрос «есть ли
+что-то новее поста N» обычно не требует базы. Новый, скрытый или
+удалённый пост сбрасывает ленты, где он был: следующий опрос
+перечитывает каждую одним запросом. Лента избранных авторов собирается
+из лент авторов.
+"""
+import time
+from bisect import bisect_right
+
+from django.core.cache import cache
+from django.db import connection
+
+from posts.models import Post
+
+RECENT = 100
+# Как часто ждущий запрос заглядывает в кэш и сколько ждёт максимум.
+POLL_INTERVAL = 0.5
+MAX_WAIT = 25
+# Страховка от устаревших лент, если сброс где-то пропущен.
+HEAD_TIMEOUT = 5 * 60
+
+
+def index_key():
+    return 'feed_head:index'
+
+
+def group_key(group_id):
+    return f'feed_head:group:{group_id}'
+
+
+def author_key(author_id):
+    return f'feed_head:author:{author_id}'
+
+
+def invalidate(group_ids=(), author_ids=()):
+    """Сбрасывает главную ленту и ленты групп и авторов."""
+    keys = [index_key()]
+    keys += [group_key(group_id) for group_id in group_ids if group_id]
+    keys += [author_key(author_id) for author_id in author_ids]
+    cache.delete_many(keys)
+
+
+def _recent(queryset):
+    return sorted(
+        queryset.order_by('-pk').values_list('pk', flat=True)[:RECENT]
+    )
+
+
+def _head(key, queryset):
+    ids = cache.get(key)
+    if ids is None:
+        ids = _recent(queryset)
+        cache.set(key, ids, HEAD_TIMEOUT)
+    return ids
+
+
+def _author_heads(author_ids):
+    """Ленты авторов; недостающие читаются из базы одним запросом."""
+    keys = {author_key(author_id): author_id for author_id in author_ids}
+    heads = cache.get_many(keys)
+    missing = [keys[key] for key in keys if key not in heads]
+    if missing:
+        loaded = {author_key(author_id): [] for author_id in missing}
+        rows = Post.objects.visible().filter(
+            author_id__in=missing
+        ).order_by('-pk').values_list('author_id', 'pk')
+        # Самые новые посты всех авторов: у тихих авторов могут не
+        # попасть только старые, для подсчёта новых они не важны.
+        for author_id, pk in rows[:RECENT * len(missing)]:
+            loaded[author_key(author_id)].append(pk)
+        for ids in loaded.values():
+            ids.reverse()
+            del ids[:-RECENT]
+        cache.set_many(loaded, HEAD_TIMEOUT)
+        heads.update(loaded)
+    return list(heads.values())
+
+
+def count_newer(heads, since):
+    """Число постов новее ``since`` во всех лентах ``heads``."""
+    return sum(len(ids) - bisect_right(ids, since) for ids in heads)
+
+
+def feed_heads(feed, obj=None, author_ids=()):
+    """Ленты, из которых состоит ``feed``: index, group, profile, follow."""
+    posts = Post.objects.visible()
+    if feed == 'index':
+        return [_head(index_key(), posts)]
+    if feed == 'group':
+        return [_head(group_key(obj.pk), posts.filter(group=obj))]
+    if feed == 'profile':
+        return [_head(author_key(obj.pk), posts.filter(author=obj))]
+    return _author_heads(author_ids)
+
+
+def wait_for_newer(load_heads, since, wait):
+    """Ждёт до ``wait`` секунд, пока в лентах не появятся посты новее
+    ``since``, и возвращает их число.
+
+    Соединение с базой закрывается до ожидания, чтобы висящие запросы
+    не держали соединения: ленты к этому моменту уже в кэше.
+    """
+    count = count_newer(load_heads(), since)
+    if count or wait <= 0:
+        return count
+    if not connection.in_atomic_block:
+        connection.close()
+    deadline = time.monotonic() + min(wait, MAX_WAIT)
+    while not count and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        count = count_newer(load_heads(), since)
+    return count
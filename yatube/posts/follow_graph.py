@@ -0,0 +1,109 @@
+"""Граф подписок в общем кэше.
+
+Для каждого пользователя в кэше лежит отсортированный массив
+``array('q')`` авторов, на которых он подписан, и пара счётчиков.
+Проверка подписки — двоичный поиск, так что после первой загрузки
+страницы не делают SQL-запросов о подписках.
+
+Сигналы ``Follow`` не правят записи, а удаляют их после коммита: чтение
+и запись массива не атомарны, и параллельные подписки теряли бы
+изменения. Решение о подписке принимает база, кэш служит только для
+вывода.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+
+from posts.models import Follow
+
+FOLLOWING = 'following'
+COUNTS = 'counts'
+TIMEOUT = 60 * 60
+
+
+def _key(direction, user_id):
+    return f'follow_graph:{direction}:{user_id}'
+
+
+def _count_query(user_id):
+    return (
+        Follow.objects.filter(author_id=user_id).count(),
+        Follow.objects.filter(user_id=user_id).count(),
+    )
+
+
+def _following_query(user_id):
+    return Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    )
+
+
+def _load(pairs):
+    """Возвращает массивы для пар ``(направление, id)``, дочитывая промахи."""
+    keys = {_key(*pair): pair for pair in pairs}
+    found = cache.get_many(keys)
+    missing = {}
+    for key, pair in keys.items():
+        if key not in found:
+            direction, user_id = pair
+            if direction == COUNTS:
+                missing[key] = _count_query(user_id)
+            else:
+                missing[key] = array(
+                    'q', sorted(set(_following_query(user_id)))
+                )
+    if missing:
+        cache.set_many(missing, TIMEOUT)
+        found.update(missing)
+    return {pair: found[key] for key, pair in keys.items()}
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def followees(user_id):
+    return _load([(FOLLOWING, user_id)])[(FOLLOWING, user_id)]
+
+
+def is_following(user_id, author_ids):
+    """Возвращает множество авторов из ``author_ids``, на которых подписан
+    пользователь."""
+    if user_id is None:
+        return set()
+    ids = followees(user_id)
+    return {author_id for author_id in author_ids if _contains(ids, author_id)}
+
+
+def counts(user_id):
+    """Число подписчиков и подписок пользователя."""
+    return _load([(COUNTS, user_id)])[(COUNTS, user_id)]
+
+
+def profile_state(viewer_id, author_id):
+    """Подписан ли зритель на автора и счётчики автора одним обращением
+    к кэшу."""
+    pairs = [(COUNTS, author_id)]
+    if viewer_id is not None:
+        pairs.append((FOLLOWING, viewer_id))
+    found = _load(pairs)
+    following = viewer_id is not None and _contains(
+        found[(FOLLOWING, viewer_id)], author_id
+    )
+    followers_count, following_count = found[(COUNTS, author_id)]
+    return {
+        'following': following,
+        'followers_count': followers_count,
+        'following_count': following_count,
+    }
+
+
+def invalidate(user_id, author_id):
+    """Сбрасывает записи обоих участников подписки."""
+    cache.delete_many([
+        _key(FOLLOWING, user_id),
+        _key(COUNTS, user_id),
+        _key(COUNTS, author_id),
+    ])
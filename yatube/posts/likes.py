@@ -0,0 +1,104 @@
+"""Лайки постов и их счётчики без ``COUNT(*)`` на чтении.
+
+Каждый лайк — строка ``(user, post)`` с уникальным ключом, а число
+лайков хранится в нескольких строках ``LikeCounter``: запись попадает в
+случайную часть, чтение складывает части. Если счётчик разошёлся
+с лайками (например, после удаления пользователя), его исправляет
+команда ``reconcile_likes``.
+"""
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from posts.models import Like, LikeCounter
+
+DEFAULT_SHARDS = 8
+
+
+def shard_count():
+    return getattr(settings, 'LIKE_COUNTER_SHARDS', DEFAULT_SHARDS)
+
+
+def _bump(post_id, delta):
+    shard = random.randrange(shard_count())
+    counter = LikeCounter.objects.filter(post_id=post_id, shard=shard)
+    if not counter.update(count=F('count') + delta):
+        LikeCounter.objects.bulk_create(
+            [LikeCounter(post_id=post_id, shard=shard)],
+            ignore_conflicts=True,
+        )
+        counter.update(count=F('count') + delta)
+
+
+def like(user, post_id):
+    """Ставит лайк; возвращает ``False``, если он уже стоял."""
+    with transaction.atomic():
+        _, created = Like.objects.get_or_create(user=user, post_id=post_id)
+        if created:
+            _bump(post_id, 1)
+    return created
+
+
+def unlike(user, post_id):
+    """Снимает лайк; возвращает ``False``, если его не было."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+        if deleted:
+            # Часть может уйти в минус, важна только сумма частей.
+            _bump(post_id, -1)
+    return bool(deleted)
+
+
+def like_counts(post_ids):
+    """Возвращает число лайков постов одним запросом."""
+    return dict(
+        LikeCounter.objects.filter(post_id__in=post_ids)
+        .values('post_id').annotate(total=Sum('count'))
+        .values_list('post_id', 'total')
+    )
+
+
+def attach_likes(posts, user):
+    """Проставляет постам ``like_count`` и ``liked`` для зрителя.
+
+    Для страницы ленты это два запроса независимо от числа постов.
+    """
+    posts = list(posts)
+    ids = [post.pk for post in posts]
+    counts = like_counts(ids) if ids else {}
+    liked = set()
+    if ids and user.is_authenticated:
+        liked = set(
+            user.likes.filter(post_id__in=ids)
+            .values_list('post_id', flat=True)
+        )
+    for post in posts:
+        post.like_count = counts.get(post.pk, 0)
+        post.liked = post.pk in liked
+    return posts
+
+
+def reconcile(post_ids):
+    """Сверяет счётчики постов с лайками и возвращает число исправленных."""
+    actual = dict(
+        Like.objects.filter(post_id__in=post_ids)
+        .values('post_id').annotate(total=Count('pk'))
+        .values_list('post_id', 'total')
+    )
+    stored = like_counts(post_ids)
+    wrong = [
+        post_id for post_id in post_ids
+        if actual.get(post_id, 0) != stored.get(post_id, 0)
+    ]
+    for post_id in wrong:
+        with transaction.atomic():
+            counters = LikeCounter.objects.select_for_update().filter(
+                post_id=post_id
+            )
+            list(counters)  # Блокирует части до конца транзакции.
+            total = Like.objects.filter(post_id=post_id).count()
+            counters.delete()
+            LikeCounter.objects.create(post_id=post_id, shard=0, count=total)
+    return len(wrong)
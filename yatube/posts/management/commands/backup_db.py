@@ -0,0 +1,35 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import PAGES, PAUSE, BackupError, backup
+
+
+class Command(BaseCommand):
+    help = (
+        'Делает сжатую копию базы SQLite, не останавливая запись, и '
+        'проверяет её целостность.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', help='Путь к архиву .sqlite3.gz.')
+        parser.add_argument(
+            '--pages', type=int, default=PAGES,
+            help='Сколько страниц копировать за шаг; -1 — за один шаг.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=PAUSE,
+            help='Пауза между шагами в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            size, digest = backup(
+                options['target'], pages=options['pages'],
+                pause=options['pause'],
+            )
+        except (BackupError, OSError, sqlite3.Error) as error:
+            raise CommandError(f'Копия не создана: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Копия {options["target"]}: {size} байт, sha256 {digest}'
+        ))
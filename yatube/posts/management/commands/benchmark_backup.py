@@ -0,0 +1,133 @@
+import math
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+
+from core.backup import PAGES, PAUSE, backup
+
+
+def percentile(ordered, percent):
+    """Процентиль отсортированного списка методом ближайшего ранга."""
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет задержку страниц сайта в покое и во время горячей '
+        'копии базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Адрес страницы; можно указать несколько раз.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков, запрашивающих страницы.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=5,
+            help='Сколько секунд мерить задержку в покое.',
+        )
+        parser.add_argument(
+            '--host', default='localhost',
+            help='Заголовок Host запросов: должен быть в ALLOWED_HOSTS.',
+        )
+        parser.add_argument('--pages', type=int, default=PAGES)
+        parser.add_argument('--pause', type=float, default=PAUSE)
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/']
+        self.host = options['host']
+        deadline = time.monotonic() + options['duration']
+        idle = self.measure(
+            paths, options['workers'], lambda: time.monotonic() >= deadline
+        )
+        self.report('В покое', idle)
+
+        done = threading.Event()
+        timings = []
+        handle, target = tempfile.mkstemp(suffix='.sqlite3.gz')
+        os.close(handle)
+
+        def run_backups():
+            # Копии идут подряд, чтобы замер длился не меньше --duration.
+            deadline = time.monotonic() + options['duration']
+            try:
+                while not timings or time.monotonic() < deadline:
+                    started = time.monotonic()
+                    backup(target, pages=options['pages'],
+                           pause=options['pause'])
+                    timings.append(time.monotonic() - started)
+            finally:
+                done.set()
+
+        thread = threading.Thread(target=run_backups)
+        thread.start()
+        try:
+            during = self.measure(paths, options['workers'], done.is_set)
+        finally:
+            thread.join()
+            os.remove(target)
+        self.report('Во время копий', during)
+        if timings:
+            self.stdout.write(
+                f'Копий: {len(timings)}, в среднем '
+                f'{statistics.mean(timings):.3f} с'
+            )
+
+    def measure(self, paths, workers, stop):
+        """Запрашивает страницы по кругу, пока ``stop()`` не вернёт True."""
+
+        def worker(offset):
+            latencies, errors = [], 0
+            # Запросы проходят через middleware, как у настоящего сервера.
+            client = Client(HTTP_HOST=self.host)
+            try:
+                shift = offset % len(paths)
+                for path in cycle(paths[shift:] + paths[:shift]):
+                    if stop():
+                        break
+                    started = time.monotonic()
+                    if not self.request(client, path):
+                        errors += 1
+                    latencies.append(time.monotonic() - started)
+            finally:
+                connections.close_all()
+            return latencies, errors
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(worker, range(workers)))
+        latencies = [value for result, _ in results for value in result]
+        return latencies, sum(errors for _, errors in results)
+
+    def request(self, client, path):
+        try:
+            response = client.get(path)
+        except Exception:
+            return False
+        return response.status_code < 400
+
+    def report(self, title, measured):
+        latencies, errors = measured
+        if len(latencies) < 2:
+            self.stdout.write(f'{title}: слишком мало запросов')
+            return
+        latencies = sorted(latencies)
+        self.stdout.write(
+            f'{title}: запросов {len(latencies)}, ошибок {errors}, '
+            f'p50 {percentile(latencies, 50) * 1000:.1f} мс, '
+            f'p95 {percentile(latencies, 95) * 1000:.1f} мс, '
+            f'p99 {percentile(latencies, 99) * 1000:.1f} мс, '
+            f'max {latencies[-1] * 1000:.1f} мс'
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.sitemaps import BATCH_SIZE, build
+
+
+class Command(BaseCommand):
+    help = (
+        'Дописывает в карту сайта новые посты, группы и профили; '
+        'с --full строит её заново.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересобрать все файлы, убрав удалённые записи.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько строк читать за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        written = build(full=options['full'],
+                        batch_size=options['batch_size'])
+        for section, count in written.items():
+            self.stdout.write(f'{section}: новых адресов {count}')
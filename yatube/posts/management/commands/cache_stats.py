@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import TIERS, tiered_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает попадания и промахи двухуровневого кэша, накопленные '
+        'всеми процессами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        stats = tiered_cache.shared_stats()
+        for tier in TIERS:
+            tier_stats = stats[tier]
+            self.stdout.write(
+                f'{tier}: попаданий {tier_stats["hits"]}, '
+                f'промахов {tier_stats["misses"]}, '
+                f'доля попаданий {tier_stats["hit_ratio"]:.2%}'
+            )
+        self.stdout.write(
+            f'Отдано устаревших копий: {stats["stale"]}, '
+            f'пересчётов: {stats["recomputes"]}'
+        )
+        if options['reset']:
+            tiered_cache.reset_shared_stats()
+            self.stdout.write('Счётчики обнулены.')
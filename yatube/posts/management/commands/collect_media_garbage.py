@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from posts.media_gc import CHUNK_SIZE, MIN_AGE, collect
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов и их миниатюры, на которые больше не '
+        'ссылается ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, ничего не удаляя.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Сколько потоков удаляют файлы.',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=0,
+            help='Не больше стольких удалений в секунду; 0 — без ограничения.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=MIN_AGE,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Сколько имён проверять по базе одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        report = None
+        if options['dry_run'] or options['verbosity'] > 1:
+            report = self.stdout.write
+        counts = collect(
+            dry_run=options['dry_run'],
+            workers=options['workers'],
+            rate=options['rate'],
+            min_age=options['min_age'],
+            chunk_size=options['chunk_size'],
+            report=report,
+        )
+        verb = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{verb} картинок: {counts["originals"]}, '
+            f'каталогов миниатюр: {counts["thumbnails"]}'
+        )
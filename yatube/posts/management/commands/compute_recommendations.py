@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import TOP_K, compute
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «на кого подписаться» по графу '
+        'подписок. Требует NumPy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=TOP_K,
+            help='Сколько рекомендаций хранить для пользователя.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Сколько пользователей оценивать за раз; по умолчанию '
+                 'подбирается по размеру графа.',
+        )
+
+    def handle(self, *args, **options):
+        saved = compute(options['top_k'], options['chunk_size'])
+        self.stdout.write(f'Сохранено рекомендаций: {saved}')
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from core.images import WIDTHS, fingerprint, save_thumbnail
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает хэши картинок постов, у которых их ещё нет, и создаёт '
+        'недостающие миниатюры.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов читать за один запрос.',
+        )
+
+    def process(self, post):
+        """Возвращает ``True``, если картинку удалось обработать."""
+        try:
+            if not post.image_hash:
+                post.image.open()
+                try:
+                    post.image_hash, post.image_placeholder = fingerprint(
+                        post.image
+                    )
+                finally:
+                    post.image.close()
+                Post.objects.filter(pk=post.pk).update(
+                    image_hash=post.image_hash,
+                    image_placeholder=post.image_placeholder,
+                )
+            for width in WIDTHS:
+                save_thumbnail(post.image, post.image_hash, width)
+        except (OSError, ValueError) as error:
+            self.stderr.write(f'Пост {post.pk}: {error}')
+            return False
+        return True
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        last_pk = 0
+        posts = Post.objects.exclude(image='').only(
+            'pk', 'image', 'image_hash', 'image_placeholder'
+        ).order_by('pk')
+        while True:
+            batch = list(
+                posts.filter(pk__gt=last_pk)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            for post in batch:
+                if self.process(post):
+                    done += 1
+                else:
+                    failed += 1
+            last_pk = batch[-1].pk
+        self.stdout.write(
+            f'Обработано картинок: {done}, с ошибками: {failed}'
+        )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.deletion import BATCH_SIZE, process_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет пользователей, группы и посты, поставленные в очередь '
+        'на удаление, небольшими пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько строк удалять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.05,
+            help='Пауза между пачками в секундах.',
+        )
+        parser.add_argument(
+            '--loop', type=float, default=None, metavar='SECONDS',
+            help='Не завершаться, а проверять очередь с этим интервалом.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done = process_pending(options['batch_size'], options['pause'])
+            if done:
+                self.stdout.write(f'Выполнено задач удаления: {done}')
+            if options['loop'] is None:
+                return
+            time.sleep(options['loop'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import recompute
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает оценки популярности свежих постов с нуля '
+        'и убирает устаревшие.'
+    )
+
+    def handle(self, *args, **options):
+        count = recompute()
+        self.stdout.write(f'Пересчитаны оценки постов: {count}')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.likes import reconcile
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики лайков с самими лайками и исправляет расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов сверять за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        fixed = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            fixed += reconcile(ids)
+            last_pk = ids[-1]
+        self.stdout.write(f'Исправлено счётчиков лайков: {fixed}')
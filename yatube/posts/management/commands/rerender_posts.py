@@ -0,0 +1,118 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Comment, Post, resolve_mentions
+from posts.rendering import RENDER_VERSION, render_rows, setup_worker
+from posts.tags import reindex_posts
+
+
+class InlineExecutor:
+    """Выполняет задачи сразу в текущем процессе."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново отрисовывает HTML постов и комментариев, сохранённый '
+        'старой версией правил, параллельно и пачками, и перестраивает '
+        'индекс тегов и упоминаний перерисованных постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько записей отрисовывать и сохранять за раз.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов отрисовки; 0 — в текущем процессе.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перерисовать все записи, а не только устаревшие.',
+        )
+
+    def handle(self, *args, **options):
+        targets = (
+            (Post, ['text_html', 'preview', 'render_version']),
+            (Comment, ['text_html', 'render_version']),
+        )
+        for model, fields in targets:
+            queryset = model.objects.all()
+            if not options['all']:
+                queryset = queryset.filter(render_version__lt=RENDER_VERSION)
+            done = self.rerender(queryset, fields, options)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: перерисовано {done}'
+            )
+
+    def rerender(self, queryset, fields, options):
+        workers = options['workers']
+        if workers:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=setup_worker,
+                initargs=(settings.SETTINGS_MODULE,),
+            )
+        else:
+            executor = InlineExecutor()
+        model = queryset.model
+        done = 0
+        # В работе держим не больше двух пачек на процесс, чтобы не
+        # загружать всю таблицу в память раньше, чем её успеют отрисовать.
+        pending = deque()
+        with executor:
+            for rows in self.chunks(queryset, options['chunk_size']):
+                users = resolve_mentions(text for _, text in rows)
+                future = executor.submit(render_rows, rows, users)
+                pending.append((rows, users, future))
+                if len(pending) >= max(workers, 1) * 2:
+                    rows, users, future = pending.popleft()
+                    done += self.save(
+                        model, fields, rows, users, future.result()
+                    )
+            while pending:
+                rows, users, future = pending.popleft()
+                done += self.save(model, fields, rows, users, future.result())
+        return done
+
+    @staticmethod
+    def chunks(queryset, size):
+        last_pk = 0
+        while True:
+            rows = list(
+                queryset.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'text')[:size]
+            )
+            if not rows:
+                return
+            yield rows
+            last_pk = rows[-1][0]
+
+    @staticmethod
+    def save(model, fields, rows, users, rendered):
+        if model is Post:
+            reindex_posts(rows, users)
+        objs = []
+        for pk, html, preview in rendered:
+            obj = model(pk=pk, text_html=html, render_version=RENDER_VERSION)
+            if 'preview' in fields:
+                obj.preview = preview
+            objs.append(obj)
+        model.objects.bulk_update(objs, fields)
+        return len(objs)
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import BackupError, database_path, restore
+
+
+class Command(BaseCommand):
+    help = 'Восстанавливает базу SQLite из архива, созданного backup_db.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Путь к архиву .sqlite3.gz.')
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false',
+            dest='interactive', help='Не спрашивать подтверждения.',
+        )
+
+    def handle(self, *args, **options):
+        database = database_path()
+        if options['interactive']:
+            answer = input(
+                f'Все данные в {database} будут заменены копией '
+                f'{options["source"]}. Введите "yes", чтобы продолжить: '
+            )
+            if answer != 'yes':
+                raise CommandError('Восстановление отменено.')
+        try:
+            restore(options['source'], database)
+        except (BackupError, OSError, sqlite3.Error) as error:
+            raise CommandError(f'База не восстановлена: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'База {database} восстановлена из {options["source"]}'
+        ))
@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кэш страниц и фрагментов самых посещаемых страниц: '
+        'первые страницы ленты, ленты групп, профили самых активных '
+        'авторов и самые обсуждаемые посты. Миниатюры картинок с хэшем '
+        'не нужны при отрисовке и не создаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=3,
+            help='Сколько первых страниц общей ленты прогреть.',
+        )
+        parser.add_argument(
+            '--authors', type=int, default=20,
+            help='Сколько профилей самых активных авторов прогреть.',
+        )
+        parser.add_argument(
+            '--posts', type=int, default=20,
+            help='Сколько самых обсуждаемых постов прогреть.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число параллельных потоков.',
+        )
+
+    def handle(self, *args, **options):
+        paths = list(self.collect_paths(options))
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for path, result, elapsed in executor.map(self.warm, paths):
+                self.stdout.write(f'{result:>5} {elapsed:7.3f} с  {path}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето страниц: {len(paths)} '
+            f'за {time.monotonic() - started:.3f} с'
+        ))
+
+    def collect_paths(self, options):
+        index = reverse('posts:index')
+        # Ключ кэша — полный путь: первую страницу открывают как «/».
+        yield index
+        for page in range(2, options['pages'] + 1):
+            yield f'{index}?page={page}'
+        for slug in Group.objects.values_list('slug', flat=True).iterator():
+            yield reverse('posts:group_list', kwargs={'slug': slug})
+        authors = (
+            User.objects.annotate(posts_count=Count('posts'))
+            .filter(posts_count__gt=0)
+            .order_by('-posts_count')
+            .values_list('username', flat=True)[:options['authors']]
+        )
+        for username in authors:
+            yield reverse('posts:profile', kwargs={'username': username})
+        posts = (
+            Post.objects.annotate(comments_count=Count('comments'))
+            .filter(comments_count__gt=0)
+            .order_by('-comments_count')
+            .values_list('pk', flat=True)[:options['posts']]
+        )
+        for post_id in posts:
+            yield reverse('posts:post_detail', kwargs={'post_id': post_id})
+
+    def warm(self, path):
+        """Отрисовывает страницу, заполняя кэш страниц и фрагментов."""
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        # Прогрев — не просмотр: счётчики и тренды он не трогает.
+        request.cache_warming = True
+        match = resolve(request.path_info)
+        started = time.monotonic()
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+            result = response.status_code
+        except Exception as error:
+            result = type(error).__name__
+        finally:
+            connections.close_all()
+        return path, result, time.monotonic() - started
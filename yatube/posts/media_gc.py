@@ -0,0 +1,199 @@
+"""Удаление файлов картинок, на которые больше не ссылаются посты.
+
+После правки картинки или удаления поста в ``MEDIA_ROOT`` остаются
+исходник, его миниатюры sorl (``cache/``) и миниатюры по хэшу
+(``thumbs/``). Дерево обходится ``os.scandir`` без загрузки списка
+файлов целиком: имена проверяются по базе пачками по ``chunk_size``,
+так что в памяти одновременно лежит одна пачка.
+
+Свежие файлы (моложе ``min_age``) не трогаются: форма сохраняет файл
+раньше, чем строку поста, и такой файл ещё не сирота.
+"""
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from sorl.thumbnail import default as sorl_default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core.images import THUMBNAIL_DIR
+from posts.models import Post
+
+CHUNK_SIZE = 1000
+MIN_AGE = 60 * 60
+
+
+class RateLimiter:
+    """Не больше ``rate`` удалений в секунду на все потоки; 0 — без
+    ограничения."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _subdirs(path):
+    try:
+        with os.scandir(path) as entries:
+            return [entry.path for entry in entries
+                    if entry.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+
+
+def scan_files(root, min_age):
+    """Пути файлов дерева ``root`` старше ``min_age`` секунд."""
+    cutoff = time.time() - min_age
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif (entry.is_file(follow_symlinks=False)
+                      and entry.stat().st_mtime < cutoff):
+                    yield entry.path
+
+
+def orphaned_originals(media_root, min_age, chunk_size):
+    """Пары ``(имя в хранилище, путь)`` исходников без поста."""
+    upload_dir = os.path.join(media_root, Post.image.field.upload_to)
+    for chunk in _chunks(scan_files(upload_dir, min_age), chunk_size):
+        names = {
+            os.path.relpath(path, media_root).replace(os.sep, '/'): path
+            for path in chunk
+        }
+        referenced = set(
+            Post.objects.filter(image__in=list(names))
+            .values_list('image', flat=True)
+        )
+        for name, path in names.items():
+            if name not in referenced:
+                yield name, path
+
+
+def orphaned_thumbnail_dirs(media_root, min_age, chunk_size):
+    """Каталоги ``thumbs/aa/<хэш>``, хэша которых нет ни у одного поста."""
+    cutoff = time.time() - min_age
+    hash_dirs = (
+        path
+        for prefix in _subdirs(os.path.join(media_root, THUMBNAIL_DIR))
+        for path in _subdirs(prefix)
+        if os.stat(path).st_mtime < cutoff
+    )
+    for chunk in _chunks(hash_dirs, chunk_size):
+        dirs = {os.path.basename(path): path for path in chunk}
+        known = set(
+            Post.objects.filter(image_hash__in=list(dirs))
+            .values_list('image_hash', flat=True)
+        )
+        for image_hash, path in dirs.items():
+            if image_hash not in known:
+                yield path
+
+
+def forget_sorl_thumbnails(names):
+    """Удаляет миниатюры sorl исходников ``names`` и их записи в
+    key-value store: записи пачки — одним удалением."""
+    kvstore = sorl_default.kvstore
+    keys = []
+    for name in names:
+        source = ImageFile(name)
+        for key in kvstore._get(source.key, identity='thumbnails') or ():
+            thumbnail = kvstore._get(key)
+            if thumbnail is not None:
+                thumbnail.delete()
+            keys.append(add_prefix(key))
+        keys += [add_prefix(source.key), add_prefix(source.key, 'thumbnails')]
+    if keys:
+        kvstore._delete_raw(*keys)
+
+
+def _run(function, items, workers):
+    """Выполняет ``function`` для пачки; потоки закрывают свои
+    соединения с базой."""
+    if workers <= 1:
+        return [function(item) for item in items]
+
+    def task(item):
+        try:
+            return function(item)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(task, items))
+
+
+def collect(dry_run=False, workers=1, rate=0, min_age=MIN_AGE,
+            chunk_size=CHUNK_SIZE, report=None):
+    """Удаляет (или при ``dry_run`` только находит) файлы-сироты.
+
+    ``report`` вызывается с путём каждого найденного файла или каталога.
+    Возвращает число исходников и каталогов миниатюр по хэшу.
+    """
+    media_root = settings.MEDIA_ROOT
+    limiter = RateLimiter(rate)
+    report = report or (lambda path: None)
+
+    def remove_original(orphan):
+        name, path = orphan
+        report(path)
+        if dry_run:
+            return
+        limiter.wait()
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def remove_thumbnails(path):
+        report(path)
+        if not dry_run:
+            limiter.wait()
+            shutil.rmtree(path, ignore_errors=True)
+
+    counts = {'originals': 0, 'thumbnails': 0}
+    for chunk in _chunks(
+        orphaned_originals(media_root, min_age, chunk_size), chunk_size
+    ):
+        _run(remove_original, chunk, workers)
+        if not dry_run:
+            forget_sorl_thumbnails([name for name, path in chunk])
+        counts['originals'] += len(chunk)
+    for chunk in _chunks(
+        orphaned_thumbnail_dirs(media_root, min_age, chunk_size), chunk_size
+    ):
+        _run(remove_thumbnails, chunk, workers)
+        counts['thumbnails'] += len(chunk)
+    return counts
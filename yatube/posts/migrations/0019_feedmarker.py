@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0018_groupsubscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedMarker',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_marker', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_seen', models.DateTimeField()),
+                ('unread', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
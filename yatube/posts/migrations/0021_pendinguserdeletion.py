@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def flag_queued_users(apps, schema_editor):
+    """Пользователи, уже стоящие в очереди, остаются скрытыми."""
+    DeletionTask = apps.get_model('posts', 'DeletionTask')
+    PendingUserDeletion = apps.get_model('posts', 'PendingUserDeletion')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    user_ids = DeletionTask.objects.filter(kind='user').values('object_id')
+    PendingUserDeletion.objects.bulk_create(
+        PendingUserDeletion(user_id=pk)
+        for pk in User.objects.filter(pk__in=user_ids)
+        .values_list('pk', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0020_post_image_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingUserDeletion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pending_deletion', serialize=False, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(flag_queued_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+import math
+
+from django.db import migrations
+
+
+def to_log_scale(apps, schema_editor):
+    """Оценки теперь хранятся как двоичный логарифм суммы вкладов."""
+    TrendingScore = apps.get_model('posts', 'TrendingScore')
+    for score in TrendingScore.objects.filter(score__gt=0).iterator():
+        TrendingScore.objects.filter(pk=score.pk).update(
+            score=math.log2(score.score)
+        )
+
+
+def to_linear_scale(apps, schema_editor):
+    TrendingScore = apps.get_model('posts', 'TrendingScore')
+    for score in TrendingScore.objects.iterator():
+        TrendingScore.objects.filter(pk=score.pk).update(
+            score=2 ** score.score
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_pendinguserdeletion'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_log_scale, to_linear_scale),
+    ]
@@ -1,21 +1,50 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.html import linebreaks
+from django.utils.safestring import mark_safe
+
+from core.images import fingerprint
+from posts.rendering import (
+    RENDER_VERSION, extract_mentions, render_html, render_preview
+)
 
 User = get_user_model()
 
 
+def resolve_mentions(texts):
+    """Находит одним запросом пользователей, упомянутых в текстах."""
+    mentioned = set()
+    for text in texts:
+        mentioned |= extract_mentions(text)
+    if not mentioned:
+        return {}
+    return dict(
+        User.objects.filter(username__in=mentioned)
+        .values_list('username', 'pk')
+    )
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    pending_deletion = models.BooleanField(default=False)
 
     def __str__(self) -> str:
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        """Посты, которые не ждут удаления вместе с собой или автором."""
+        return self.filter(
+            pending_deletion=False, author__pending_deletion__isnull=True
+        )
+
+
 class Post(models.Model):
     text = models.TextField()
-    pub_date = models.DateTimeField(auto_now_add=True)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -33,10 +62,77 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Хэш содержимого картинки: из него строятся адреса миниатюр.
+    image_hash = models.CharField(
+        max_length=40, blank=True, db_index=True, editable=False
+    )
+    image_placeholder = models.TextField(blank=True, editable=False)
+    pending_deletion = models.BooleanField(default=False)
+    text_html = models.TextField(blank=True, editable=False)
+    preview = models.CharField(max_length=300, blank=True, editable=False)
+    render_version = models.PositiveSmallIntegerField(
+        default=0, db_index=True, editable=False
+    )
+    views = models.PositiveIntegerField(
+        'Просмотры', default=0, db_index=True, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Пользователи нужны и для ссылок, и для индекса упоминаний.
+        self.mentioned_users = resolve_mentions([self.text])
+        self.text_html = render_html(self.text, self.mentioned_users)
+        self.preview = render_preview(self.text)
+        self.render_version = RENDER_VERSION
+        self.update_image_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {
+                'text_html', 'preview', 'render_version'
+            }
+        if update_fields is not None and 'image' in update_fields:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {
+                'image_hash', 'image_placeholder'
+            }
+        if update_fields is None and not self._state.adding:
+            # Просмотры пишет только сброс буфера, иначе правка их затрёт.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'views'
+            ]
+        super().save(*args, **kwargs)
+
+    def update_image_hash(self):
+        """Считает хэш новой картинки; у старой он уже посчитан."""
+        if not self.image:
+            self.image_hash = self.image_placeholder = ''
+        elif not self.image._committed:
+            try:
+                self.image_hash, self.image_placeholder = fingerprint(
+                    self.image
+                )
+            except (OSError, ValueError):
+                # Адреса миниатюр останутся за sorl.
+                self.image_hash = self.image_placeholder = ''
+
+    @property
+    def body(self):
+        """HTML текста; до перерисовки старых записей — простые абзацы."""
+        if self.render_version:
+            return mark_safe(self.text_html)
+        return linebreaks(self.text, autoescape=True)
+
+    @property
+    def title_preview(self):
+        """Превью для заголовка; у старых записей оно ещё пустое."""
+        if self.render_version:
+            return self.preview
+        return render_preview(self.text)
+
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
@@ -56,6 +152,23 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    text_html = models.TextField(blank=True, editable=False)
+    render_version = models.PositiveSmallIntegerField(
+        default=0, db_index=True, editable=False
+    )
+
+    def save(self, *args, **kwargs):
+        self.text_html = render_html(
+            self.text, resolve_mentions([self.text])
+        )
+        self.render_version = RENDER_VERSION
+        super().save(*args, **kwargs)
+
+    @property
+    def body(self):
+        if self.render_version:
+            return mark_safe(self.text_html)
+        return linebreaks(self.text, autoescape=True)
 
 
 class Follow(models.Model):
@@ -69,3 +182,219 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Повторную подписку отсекает база, а не кэш графа подписок.
+        unique_together = ('user', 'author')
+        # Для списков подписчиков и подписок, листаемых по id.
+        indexes = [
+            models.Index(fields=['author', '-id']),
+            models.Index(fields=['user', '-id']),
+        ]
+
+
+class PendingUserDeletion(models.Model):
+    """Пользователь, который ждёт фонового удаления.
+
+    Модель пользователя встроенная, поэтому отметка — отдельная строка,
+    а не поле, как ``pending_deletion`` у поста и группы.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='pending_deletion'
+    )
+
+
+class DeletionTask(models.Model):
+    """Объект, зависимые записи которого удаляются фоновыми пачками."""
+
+    USER = 'user'
+    GROUP = 'group'
+    POST = 'post'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+        (POST, 'Пост'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.PositiveIntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created']
+        unique_together = ('kind', 'object_id')
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class PostTag(models.Model):
+    """Тег поста; дата публикации скопирована для индекса ленты тега."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags'
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('post', 'tag')
+        indexes = [models.Index(fields=['tag', '-pub_date'])]
+
+
+class Mention(models.Model):
+    """Упоминание пользователя в посте."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('post', 'user')
+        indexes = [models.Index(fields=['user', '-pub_date'])]
+
+
+class Like(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'post')
+
+
+class LikeCounter(models.Model):
+    """Часть счётчика лайков поста.
+
+    Лайки одного поста раскладываются по нескольким строкам, чтобы
+    одновременные лайки популярного поста не ждали блокировку одной строки.
+    Число лайков — сумма ``count`` по всем частям.
+    """
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='like_shards'
+    )
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'shard')
+
+
+class TrendingScore(models.Model):
+    """Оценка популярности свежего поста.
+
+    Вклад события растёт со временем как ``2 ** (t / HALF_LIFE)``, поэтому
+    уже накопленные оценки не нужно пересчитывать: сравнение по ``score``
+    совпадает со сравнением оценок, затухающих со временем. ``score`` —
+    двоичный логарифм суммы вкладов.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+    score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score']),
+            models.Index(fields=['group', '-score']),
+        ]
+
+
+class Recommendation(models.Model):
+    """Автор, на которого пользователю стоит подписаться.
+
+    Заполняется пакетно командой ``compute_recommendations``.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations'
+    )
+    candidate = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('user', 'candidate')
+        indexes = [models.Index(fields=['user', '-score'])]
+
+
+class GroupSubscription(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_subscriptions'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='subscriptions'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'group')
+
+
+class FeedMarker(models.Model):
+    """Когда пользователь последний раз смотрел ленту избранных авторов
+    и сколько постов вышло с тех пор."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_marker'
+    )
+    last_seen = models.DateTimeField()
+    unread = models.PositiveIntegerField(default=0)
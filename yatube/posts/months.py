@@ -0,0 +1,103 @@
+"""Индекс «месяц → позиция в ленте» для перехода к месяцу.
+
+Новый пост встаёт в начало ленты и сдвигает на одну позицию все месяцы,
+кроме текущего. Поэтому индекс при публикации не перестраивается:
+сдвиг копится атомарным ``incr`` в отдельном ключе и прибавляется при
+чтении. Перестраивается индекс, только когда начался новый месяц или пост
+исчез из ленты.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+MONTH_INDEX_TIMEOUT = 60 * 60 * 24
+
+
+def feed_key(group_id=None, author_id=None):
+    if group_id is not None:
+        return f'group:{group_id}'
+    if author_id is not None:
+        return f'author:{author_id}'
+    return 'all'
+
+
+def month_index(feed, posts):
+    """Возвращает пары (месяц, позиция первого поста месяца в ленте).
+
+    Индекс строится одним запросом с группировкой по месяцам и хранится
+    в кэше вместе с числом постов, добавленных после построения.
+    """
+    key, added_key = f'month_index:{feed}', f'month_index:{feed}:added'
+    found = cache.get_many([key, added_key])
+    if len(found) == 2:
+        added = found[added_key]
+        return [
+            (month, position + added if position else 0)
+            for month, position in found[key]
+        ]
+    rows = (
+        posts.order_by()
+        .annotate(month=TruncMonth('pub_date'))
+        .values('month')
+        .annotate(count=Count('pk'))
+        .order_by('-month')
+    )
+    index = []
+    position = 0
+    for row in rows:
+        index.append((row['month'].date(), position))
+        position += row['count']
+    cache.set_many({key: index, added_key: 0}, MONTH_INDEX_TIMEOUT)
+    return index
+
+
+def month_pages(feed, posts, per_page):
+    """Переводит позиции индекса в номера страниц ленты.
+
+    Индекс читается лениво — только если шаблон выводит навигацию.
+    """
+    return SimpleLazyObject(lambda: [
+        (month, position // per_page + 1)
+        for month, position in month_index(feed, posts)
+    ])
+
+
+def _feeds(group_ids, author_ids):
+    feeds = ['all']
+    feeds += [feed_key(group_id=pk) for pk in group_ids if pk is not None]
+    feeds += [feed_key(author_id=pk) for pk in author_ids]
+    return feeds
+
+
+def add_post(post):
+    """Сдвигает индексы лент нового поста, не перестраивая их."""
+    month = timezone.localtime(post.pub_date).date().replace(day=1)
+    stale = []
+    for feed in _feeds({post.group_id}, {post.author_id}):
+        key = f'month_index:{feed}'
+        index = cache.get(key)
+        if index is None:
+            continue
+        if not index or index[0][0] != month:
+            # Первый пост месяца: в индексе появляется новая строка.
+            stale.append(feed)
+            continue
+        try:
+            cache.incr(f'{key}:added')
+        except ValueError:
+            stale.append(feed)
+    _delete(stale)
+
+
+def _delete(feeds):
+    cache.delete_many([
+        key
+        for feed in feeds
+        for key in (f'month_index:{feed}', f'month_index:{feed}:added')
+    ])
+
+
+def invalidate(group_ids=(), author_ids=()):
+    _delete(_feeds(group_ids, author_ids))
@@ -0,0 +1,113 @@
+"""Преобразование текста постов и комментариев в безопасный HTML.
+
+Текст обрабатывается один раз при сохранении: результат и краткое
+текстовое превью хранятся рядом с исходником. При смене правил
+достаточно увеличить ``RENDER_VERSION`` и запустить команду
+``rerender_posts``.
+"""
+import os
+import re
+
+import django
+from django.urls import reverse
+from django.utils.html import urlize
+from django.utils.text import Truncator
+
+RENDER_VERSION = 2
+PREVIEW_WORDS = 30
+PREVIEW_LENGTH = 300
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+HTML_TAG = re.compile(r'(<[^>]+>)')
+# Не совпадают с сущностями вида &#39; и с частями адресов и e-mail.
+HASHTAG = re.compile(r'(?<![\w&/#])#(\w{1,50})')
+MENTION = re.compile(r'(?<![\w/@])@([\w+-]{1,150}(?:\.[\w+-]+)*)')
+MARKUP = (
+    (re.compile(r'`([^`\n]+)`'), r'<code>\1</code>'),
+    (re.compile(r'\*\*([^*\n]+)\*\*'), r'<strong>\1</strong>'),
+    (re.compile(r'(?<![*\w])\*([^*\n]+)\*(?![*\w])'), r'<em>\1</em>'),
+)
+
+
+def extract_tags(text):
+    return {tag.lower() for tag in HASHTAG.findall(text)}
+
+
+def extract_mentions(text):
+    return set(MENTION.findall(text))
+
+
+def link_tags(html, usernames):
+    """Превращает #теги и @упоминания вне ссылок и кода в ссылки."""
+    def tag_link(match):
+        url = reverse('posts:tag_posts', args=[match.group(1).lower()])
+        return f'<a href="{url}">{match.group(0)}</a>'
+
+    def mention_link(match):
+        if match.group(1) not in usernames:
+            return match.group(0)
+        url = reverse('posts:profile', args=[match.group(1)])
+        return f'<a href="{url}">{match.group(0)}</a>'
+
+    parts = []
+    skip = False
+    for part in HTML_TAG.split(html):
+        if part.startswith(('<a ', '<code>')):
+            skip = True
+        elif part.startswith(('</a>', '</code>')):
+            skip = False
+        elif not skip and not part.startswith('<'):
+            part = HASHTAG.sub(tag_link, part)
+            part = MENTION.sub(mention_link, part)
+        parts.append(part)
+    return ''.join(parts)
+
+
+def render_paragraph(paragraph, usernames):
+    # urlize с autoescape экранирует весь текст, поэтому разметка ниже
+    # работает только с безопасной строкой.
+    html = urlize(paragraph, nofollow=True, autoescape=True)
+    for pattern, replacement in MARKUP:
+        html = pattern.sub(replacement, html)
+    html = link_tags(html, usernames)
+    return '<p>' + html.replace('\n', '<br>') + '</p>'
+
+
+def render_html(text, usernames=()):
+    """Возвращает HTML текста: абзацы, ссылки, код, жирный и курсив.
+
+    Упоминания становятся ссылками, только если пользователь есть
+    в ``usernames``.
+    """
+    text = text.replace('\r\n', '\n').strip()
+    if not text:
+        return ''
+    return '\n'.join(
+        render_paragraph(paragraph, usernames)
+        for paragraph in PARAGRAPH_BREAK.split(text)
+    )
+
+
+def render_preview(text):
+    """Возвращает короткое текстовое превью для заголовков."""
+    preview = Truncator(' '.join(text.split())).words(PREVIEW_WORDS)
+    return Truncator(preview).chars(PREVIEW_LENGTH)
+
+
+def render_rows(rows, usernames=()):
+    """Отрисовывает пачку ``(pk, text)`` для параллельной обработки."""
+    return [
+        (pk, render_html(text, usernames), render_preview(text))
+        for pk, text in rows
+    ]
+
+
+def setup_worker(settings_module):
+    """Настраивает Django в процессе отрисовки.
+
+    Запущенный через spawn (macOS, Windows) процесс не наследует
+    настроенный Django, а ``render_rows`` строит ссылки через ``reverse``.
+    Модуль не импортирует модели, поэтому его можно загрузить до настройки.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
@@ -0,0 +1,96 @@
+import atexit
+from functools import partial
+
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from posts import (
+    feed_cache, feed_updates, follow_graph, months, tags, trending, unread
+)
+from posts.counters import flush_at_exit, flush_if_due
+from posts.models import Comment, Follow, Group, Like, Post
+
+# Просмотры пишутся в базу уже после ответа, вне бюджета запросов.
+request_finished.connect(flush_if_due, dispatch_uid='posts.flush_views')
+atexit.register(flush_at_exit)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Через __dict__, чтобы не загружать отложенные поля лишним запросом.
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+    instance._loaded_text = instance.__dict__.get('text')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    group_ids = {instance.group_id, instance._loaded_group_id}
+    if created or instance.group_id != instance._loaded_group_id:
+        feed_updates.invalidate(
+            group_ids=group_ids, author_ids={instance.author_id}
+        )
+    if created:
+        months.add_post(instance)
+        trending.add_post(instance)
+        unread.bump(instance)
+    elif instance.group_id != instance._loaded_group_id:
+        months.invalidate(
+            group_ids=group_ids, author_ids={instance.author_id}
+        )
+        trending.move_post(instance)
+    if created or instance.text != instance._loaded_text:
+        tags.sync_post(instance, created)
+    feed_cache.invalidate_post(instance, {instance._loaded_group_id})
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_text = instance.text
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    months.invalidate(
+        group_ids={instance.group_id}, author_ids={instance.author_id}
+    )
+    feed_updates.invalidate(
+        group_ids={instance.group_id}, author_ids={instance.author_id}
+    )
+    feed_cache.invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        trending.bump_post(instance.post_id, 'comment')
+
+
+@receiver(post_save, sender=Like)
+def like_saved(sender, instance, created, **kwargs):
+    if created:
+        trending.bump_post(instance.post_id, 'like')
+
+
+def _invalidate_follow_graph(follow):
+    # После коммита: иначе параллельный запрос успеет загрузить в кэш
+    # ещё не изменённые подписки.
+    transaction.on_commit(
+        partial(follow_graph.invalidate, follow.user_id, follow.author_id)
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        _invalidate_follow_graph(instance)
+        trending.bump_author(instance.author_id, 'follow')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    _invalidate_follow_graph(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    feed_cache.invalidate_group(instance)
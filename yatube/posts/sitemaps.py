@@ -0,0 +1,286 @@
+"""Карта сайта для миллионов постов: готовые gzip-файлы и индекс.
+
+``django.contrib.sitemaps`` на каждый запрос считает ``COUNT`` и листает
+таблицу страницами. Здесь файлы строит команда ``build_sitemaps``:
+посты, группы и профили читаются пачками по ключу ``pk`` и пишутся в
+``posts-00001.xml.gz`` и т. д. по ``URLS_PER_FILE`` адресов, а
+``sitemap.xml`` перечисляет их.
+
+Запуски инкрементальные: в ``.state.json`` для каждого раздела хранится
+последний записанный ``pk``, и новые строки дописываются в последний
+файл. Каждый файл — несколько gzip-членов, закрывающий ``</urlset>``
+лежит в отдельном последнем члене ``FOOTER_MEMBER``: при дозаписи файл
+без него копируется во временный, а после новых строк член дописывается
+снова. Готовый файл заменяет отдаваемый через ``os.replace``, так что
+поисковик не увидит обрезанный файл. Удалённые и скрытые записи уходят
+из карты только при полной пересборке (``full=True``).
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from core.media import MEDIA_SERVING_DEFAULTS
+from posts.models import Group, Post
+
+User = get_user_model()
+
+SITEMAPS_DEFAULTS = {
+    'ROOT': os.path.join(settings.BASE_DIR, 'sitemaps'),
+    'BASE_URL': 'http://localhost:8000',
+    'URLS_PER_FILE': 50000,
+}
+BATCH_SIZE = 5000
+COPY_CHUNK = 1024 * 1024
+INDEX_FILE = 'sitemap.xml'
+STATE_FILE = '.state.json'
+TEMP_SUFFIX = '.tmp'
+HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+FOOTER_MEMBER = gzip.compress(b'</urlset>\n', mtime=0)
+# Файлы переписываются при каждом запуске: вечное кэширование нельзя.
+SERVE_OPTIONS = {**MEDIA_SERVING_DEFAULTS, 'IMMUTABLE_PREFIXES': ()}
+# Значение, которое подставляется в reverse и заменяется на ``{}``:
+# один reverse на раздел вместо одного на строку.
+SENTINEL = '4242424242'
+URL_SAFE = "!$&'()*+,;=/~:@"
+
+
+def _settings():
+    return {**SITEMAPS_DEFAULTS, **getattr(settings, 'SITEMAPS', {})}
+
+
+def output_dir():
+    return _settings()['ROOT']
+
+
+def _url_template(viewname):
+    return reverse(viewname, args=[SENTINEL]).replace(SENTINEL, '{}')
+
+
+class Section:
+    """Раздел карты: выборка, поля строки и адрес по строке."""
+
+    def __init__(self, name, queryset, fields, viewname, lastmod=None):
+        self.name = name
+        self.queryset = queryset.order_by('pk').values_list('pk', *fields)
+        self.template = _url_template(viewname)
+        self.lastmod = lastmod
+
+    def entry(self, row, base_url):
+        loc = escape(base_url + self.template.format(
+            quote(str(row[1]), safe=URL_SAFE)
+        ))
+        lastmod = ''
+        if self.lastmod is not None:
+            lastmod = '<lastmod>{}</lastmod>'.format(
+                row[self.lastmod].isoformat(timespec='seconds')
+            )
+        return f'<url><loc>{loc}</loc>{lastmod}</url>\n'
+
+
+def sections():
+    return [
+        Section('posts', Post.objects.visible(), ('id', 'pub_date'),
+                'posts:post_detail', lastmod=2),
+        Section('groups', Group.objects.filter(pending_deletion=False),
+                ('slug',), 'posts:group_list'),
+        Section('profiles',
+                User.objects.filter(pending_deletion__isnull=True),
+                ('username',), 'posts:profile'),
+    ]
+
+
+def _open_for_append(path, file_state):
+    """Копирует файл без закрывающего члена во временный и открывает
+    копию для дозаписи.
+
+    ``None`` — файл не совпадает с состоянием (прерванный запуск или
+    ручная правка) и его надо написать заново.
+    """
+    try:
+        source = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    with source:
+        end = file_state['size'] - len(FOOTER_MEMBER)
+        source.seek(max(end, 0))
+        if end < 0 or source.read() != FOOTER_MEMBER:
+            return None
+        source.seek(0)
+        file = open(path + TEMP_SUFFIX, 'wb')
+        remaining = end
+        while remaining:
+            chunk = source.read(min(remaining, COPY_CHUNK))
+            if not chunk:
+                break
+            file.write(chunk)
+            remaining -= len(chunk)
+    return file
+
+
+class SectionWriter:
+    """Пишет строки раздела в файлы по ``per_file`` адресов."""
+
+    def __init__(self, root, section, state, per_file, base_url):
+        self.root = root
+        self.section = section
+        self.state = state
+        self.files = state.setdefault('files', [])
+        self.per_file = per_file
+        self.base_url = base_url
+        self.raw = self.member = None
+
+    def _path(self, file_state):
+        return os.path.join(self.root, file_state['name'])
+
+    def _start_file(self, after_pk):
+        self.files.append({
+            'name': f'{self.section.name}-{len(self.files) + 1:05d}.xml.gz',
+            'count': 0,
+            'after_pk': after_pk,
+        })
+        self.raw = open(self._path(self.files[-1]) + TEMP_SUFFIX, 'wb')
+        self._open_member()
+        self.member.write(HEADER.encode())
+
+    def _open_member(self):
+        self.member = gzip.GzipFile(fileobj=self.raw, mode='wb', mtime=0)
+
+    def resume(self):
+        """Продолжает последний неполный файл; возвращает ``pk``, после
+        которого читать строки."""
+        last_pk = self.state.get('last_pk', 0)
+        if not self.files or self.files[-1]['count'] >= self.per_file:
+            return last_pk
+        self.raw = _open_for_append(self._path(self.files[-1]), self.files[-1])
+        if self.raw is not None:
+            self._open_member()
+            return last_pk
+        # Файл испорчен: пишем его заново с первой строки.
+        return self.files.pop()['after_pk']
+
+    def write(self, row, last_pk):
+        if self.raw is None or self.files[-1]['count'] >= self.per_file:
+            self.close()
+            self._start_file(last_pk)
+        self.member.write(self.section.entry(row, self.base_url).encode())
+        self.files[-1]['count'] += 1
+
+    def close(self):
+        if self.raw is None:
+            return
+        self.member.close()
+        self.raw.write(FOOTER_MEMBER)
+        self.files[-1]['size'] = self.raw.tell()
+        self.raw.close()
+        path = self._path(self.files[-1])
+        os.replace(path + TEMP_SUFFIX, path)
+        self.raw = self.member = None
+
+
+def build_section(root, section, state, batch_size=BATCH_SIZE):
+    """Дописывает строки раздела новее запомненного ``pk``.
+
+    Возвращает число записанных адресов.
+    """
+    options = _settings()
+    writer = SectionWriter(
+        root, section, state, options['URLS_PER_FILE'],
+        options['BASE_URL'].rstrip('/'),
+    )
+    last_pk = writer.resume()
+    written = 0
+    try:
+        while True:
+            rows = list(section.queryset.filter(pk__gt=last_pk)[:batch_size])
+            for row in rows:
+                writer.write(row, last_pk)
+                last_pk = row[0]
+            written += len(rows)
+            if len(rows) < batch_size:
+                break
+    finally:
+        writer.close()
+    state['last_pk'] = last_pk
+    return written
+
+
+def _write_atomic(path, data):
+    temporary = path + TEMP_SUFFIX
+    with open(temporary, 'wb') as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def write_index(root, state, base_url):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<sitemapindex '
+        'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n',
+    ]
+    template = base_url + _url_template('posts:sitemap_file')
+    for section_state in state.values():
+        for file_state in section_state['files']:
+            path = os.path.join(root, file_state['name'])
+            modified = datetime.fromtimestamp(
+                os.stat(path).st_mtime, timezone.utc
+            )
+            lines.append(
+                '<sitemap><loc>{}</loc><lastmod>{}</lastmod></sitemap>\n'
+                .format(
+                    escape(template.format(file_state['name'])),
+                    modified.isoformat(timespec='seconds'),
+                )
+            )
+    lines.append('</sitemapindex>\n')
+    _write_atomic(os.path.join(root, INDEX_FILE), ''.join(lines).encode())
+
+
+def _load_state(root):
+    try:
+        with open(os.path.join(root, STATE_FILE)) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def build(full=False, batch_size=BATCH_SIZE):
+    """Строит или дополняет карту сайта; возвращает число новых адресов
+    по разделам."""
+    root = output_dir()
+    os.makedirs(root, exist_ok=True)
+    old_state = _load_state(root)
+    state = {} if full else old_state
+    written = {}
+    for section in sections():
+        written[section.name] = build_section(
+            root, section, state.setdefault(section.name, {}), batch_size
+        )
+    # Лишние файлы после полной пересборки, ставшей короче.
+    names = {
+        file_state['name']
+        for section_state in state.values()
+        for file_state in section_state['files']
+    }
+    for section_state in old_state.values():
+        for file_state in section_state.get('files', []):
+            if file_state['name'] not in names:
+                try:
+                    os.remove(os.path.join(root, file_state['name']))
+                except FileNotFoundError:
+                    pass
+    write_index(root, state, _settings()['BASE_URL'].rstrip('/'))
+    _write_atomic(
+        os.path.join(root, STATE_FILE), json.dumps(state).encode()
+    )
+    return written
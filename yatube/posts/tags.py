@@ -0,0 +1,70 @@
+"""Индекс тегов и упоминаний в постах."""
+from posts.models import Mention, Post, PostTag, Tag
+from posts.rendering import extract_mentions, extract_tags
+
+
+def get_tag_ids(names):
+    """Возвращает id тегов по именам, создавая недостающие.
+
+    Вставка с ``ignore_conflicts`` пропускает существующие теги, так что
+    хватает двух запросов без повторного чтения тех же имён.
+    """
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True
+    )
+    return dict(
+        Tag.objects.filter(name__in=names).values_list('name', 'pk')
+    )
+
+
+def sync_post(post, created):
+    """Обновляет теги и упоминания поста, меняя только разницу."""
+    tags = extract_tags(post.text)
+    user_ids = set(post.mentioned_users.values())
+    old_tags, old_user_ids = {}, set()
+    if not created:
+        old_tags = dict(post.post_tags.values_list('tag__name', 'tag_id'))
+        old_user_ids = set(post.mentions.values_list('user_id', flat=True))
+    removed = [old_tags[name] for name in old_tags.keys() - tags]
+    if removed:
+        post.post_tags.filter(tag_id__in=removed).delete()
+    added = tags - old_tags.keys()
+    if added:
+        tag_ids = get_tag_ids(added)
+        PostTag.objects.bulk_create(
+            PostTag(post=post, tag_id=tag_ids[name], pub_date=post.pub_date)
+            for name in added
+        )
+    if old_user_ids - user_ids:
+        post.mentions.filter(user_id__in=old_user_ids - user_ids).delete()
+    if user_ids - old_user_ids:
+        Mention.objects.bulk_create(
+            Mention(post=post, user_id=user_id, pub_date=post.pub_date)
+            for user_id in user_ids - old_user_ids
+        )
+
+
+def reindex_posts(rows, users):
+    """Перестраивает индекс для пачки постов ``(pk, text)``.
+
+    ``users`` — результат ``resolve_mentions`` для этой же пачки.
+    """
+    ids = [pk for pk, _ in rows]
+    pub_dates = dict(
+        Post.objects.filter(pk__in=ids).values_list('pk', 'pub_date')
+    )
+    tags = {pk: extract_tags(text) for pk, text in rows}
+    tag_ids = get_tag_ids(set().union(*tags.values()))
+    PostTag.objects.filter(post_id__in=ids).delete()
+    Mention.objects.filter(post_id__in=ids).delete()
+    PostTag.objects.bulk_create(
+        PostTag(post_id=pk, tag_id=tag_ids[name], pub_date=pub_dates[pk])
+        for pk, names in tags.items()
+        for name in names
+    )
+    Mention.objects.bulk_create(
+        Mention(post_id=pk, user_id=users[name], pub_date=pub_dates[pk])
+        for pk, text in rows
+        for name in extract_mentions(text)
+        if name in users
+    )
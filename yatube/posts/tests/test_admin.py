@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.admin import EstimatedCountPaginator
+from posts.admin import PostAdmin
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.admin, text=f'Пост {number}')
+            for number in range(25)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    @mock.patch.object(PostAdmin, 'list_per_page', 10)
+    def test_keyset_pages(self):
+        """Следующая страница выбирается по ключу последнего поста."""
+        response = self.client.get(self.url)
+        cursor = self.posts[15].pk
+        self.assertEqual(response.context['cl'].next_cursor, cursor)
+        self.assertContains(response, f'?cursor={cursor}')
+        response = self.client.get(self.url, {'cursor': cursor})
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            [post.pk for post in reversed(self.posts[5:15])],
+        )
+
+    @mock.patch.object(PostAdmin, 'list_per_page', 10)
+    def test_sorted_pages(self):
+        """Сортировка по колонке возвращает обычные номера страниц."""
+        response = self.client.get(self.url, {'o': '2'})
+        self.assertIsNone(response.context['cl'].next_cursor)
+        self.assertContains(response, '?o=2&amp;p=1')
+
+    def test_estimated_count(self):
+        """Большая таблица не пересчитывается целиком."""
+        with mock.patch('core.admin.EXACT_COUNT_LIMIT', 5):
+            paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+            self.assertEqual(paginator.count, self.posts[-1].pk)
+            paginator = EstimatedCountPaginator(
+                Post.objects.filter(text__startswith='Пост 1'), 10
+            )
+            self.assertEqual(paginator.count, 5)
+
+    def test_changelist_queries(self):
+        """Список постов не делает запросов на каждую строку."""
+        with self.assertNumQueries(7):
+            self.client.get(self.url)
+
+
+class FollowAdminTest(TestCase):
+    def test_changelist(self):
+        """Список подписок открывается и листается по ключу."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        author = User.objects.create_user(username='author')
+        follow = Follow.objects.create(user=admin, author=author)
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('admin:posts_follow_changelist'))
+        self.assertTrue(response.context['cl'].keyset)
+        self.assertEqual(list(response.context['cl'].result_list), [follow])
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from sorl.thumbnail import default as sorl_default
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core.images import thumbnail_name
+
+from posts.management.commands.benchmark_backup import Command, percentile
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class WarmCacheCommandTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='AUTHOR')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+
+    def test_warm_cache(self):
+        """Команда отрисовывает ленту, группы, профили и посты."""
+        out = StringIO()
+        call_command('warm_cache', pages=2, workers=2, stdout=out)
+        results = {
+            line.split()[-1]: line.split()[0]
+            for line in out.getvalue().splitlines()[:-1]
+        }
+        for path in ('/', '/?page=2', '/group/test-slug/',
+                     '/profile/AUTHOR/', f'/posts/{self.post.pk}/'):
+            with self.subTest(path=path):
+                self.assertEqual(results.get(path), '200')
+
+    def test_warm_cache_does_not_count_views(self):
+        """Прогрев поста не засчитывается как просмотр."""
+        with mock.patch('posts.views.record_view') as record_view:
+            call_command('warm_cache', workers=1, stdout=StringIO())
+        record_view.assert_not_called()
+
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class MediaGarbageCommandTest(TransactionTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            author=user, text='С картинкой',
+            image=SimpleUploadedFile('kept.gif', SMALL_GIF),
+        )
+        self.kept = self.path(self.post.image.name)
+        self.orphan = self.write('posts/orphan.gif')
+        self.fresh = self.write('posts/fresh.gif', old=False)
+        self.kept_thumb = self.write(
+            thumbnail_name(self.post.image_hash, 320)
+        )
+        self.orphan_thumb = self.write(thumbnail_name('f' * 40, 320))
+        os.utime(self.kept, (time.time() - 7200,) * 2)
+        for path in (self.kept_thumb, self.orphan_thumb):
+            os.utime(os.path.dirname(path), (time.time() - 7200,) * 2)
+
+    def path(self, name):
+        return os.path.join(self.media_root, name)
+
+    def write(self, name, old=True):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(SMALL_GIF)
+        if old:
+            os.utime(path, (time.time() - 7200,) * 2)
+        return path
+
+    def test_dry_run_keeps_files(self):
+        out = StringIO()
+        call_command('collect_media_garbage', dry_run=True, stdout=out)
+        self.assertIn(self.orphan, out.getvalue())
+        self.assertIn('Найдено картинок: 1, каталогов миниатюр: 1',
+                      out.getvalue())
+        self.assertTrue(os.path.exists(self.orphan))
+
+    def test_orphans_deleted(self):
+        """Удаляются только старые файлы без поста."""
+        call_command('collect_media_garbage', workers=2, rate=1000,
+                     chunk_size=1, stdout=StringIO())
+        self.assertFalse(os.path.exists(self.orphan))
+        self.assertFalse(os.path.exists(os.path.dirname(self.orphan_thumb)))
+        for path in (self.kept, self.fresh, self.kept_thumb):
+            self.assertTrue(os.path.exists(path), path)
+
+    def test_sorl_records_of_removed_originals_only(self):
+        """Из key-value store sorl уходят записи только удалённых
+        исходников, без обхода всего хранилища."""
+        orphan = get_thumbnail('posts/orphan.gif', '10x10')
+        kept = get_thumbnail(self.post.image, '10x10')
+        self.assertTrue(os.path.exists(self.path(orphan.name)))
+        with mock.patch.object(sorl_default.kvstore, 'cleanup') as cleanup:
+            call_command('collect_media_garbage', stdout=StringIO())
+        cleanup.assert_not_called()
+        self.assertFalse(os.path.exists(self.path(orphan.name)))
+        self.assertIsNone(sorl_default.kvstore.get(ImageFile(orphan)))
+        self.assertIsNone(
+            sorl_default.kvstore.get(ImageFile('posts/orphan.gif'))
+        )
+        self.assertIsNotNone(sorl_default.kvstore.get(ImageFile(kept)))
+
+
+class BenchmarkBackupCommandTest(TransactionTestCase):
+    def test_percentile(self):
+        """Процентили считаются по рангу и без statistics.quantiles."""
+        ordered = list(range(1, 101))
+        self.assertEqual(percentile(ordered, 50), 50)
+        self.assertEqual(percentile(ordered, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_measure_counts_errors(self):
+        """Замер запрашивает страницы через Client и считает ошибки."""
+        command = Command(stdout=StringIO())
+        command.host = 'localhost'
+        for path, expected in (('/', 0), ('/missing/', 3)):
+            with self.subTest(path=path):
+                requests = iter(range(3))
+                latencies, errors = command.measure(
+                    [path], 1, lambda: next(requests, None) is None
+                )
+                self.assertEqual((len(latencies), errors), (3, expected))
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.counters import flush_at_exit, view_buffer
+from posts.models import Post
+
+User = get_user_model()
+
+
+class PostViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.other = Post.objects.create(author=cls.user, text='Другой')
+
+    def setUp(self):
+        view_buffer.clear()
+        self.addCleanup(view_buffer.clear)
+        self.client = Client()
+
+    def view(self, post):
+        return self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+
+    def test_views_shown_before_flush(self):
+        """Незаписанные просмотры уже видны на странице поста."""
+        self.view(self.post)
+        response = self.view(self.post)
+        self.assertEqual(response.context['post'].view_count, 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+
+    def test_flush_writes_deltas(self):
+        """Сброс буфера записывает приращения в базу."""
+        for post in (self.post, self.post, self.other):
+            self.view(post)
+        with self.assertNumQueries(2):
+            self.assertEqual(view_buffer.flush(), 3)
+        views = dict(Post.objects.values_list('pk', 'views'))
+        self.assertEqual(views, {self.post.pk: 2, self.other.pk: 1})
+        self.assertEqual(view_buffer.pending(self.post.pk), 0)
+
+    @override_settings(POST_VIEWS={'MAX_PENDING': 2})
+    def test_flush_after_request_when_buffer_full(self):
+        """Полный буфер сбрасывается после ответа на запрос."""
+        self.view(self.post)
+        self.view(self.other)
+        self.assertEqual(
+            sorted(Post.objects.values_list('views', flat=True)), [1, 1]
+        )
+
+    def test_edit_keeps_views(self):
+        """Правка поста не затирает записанные просмотры."""
+        post = Post.objects.get(pk=self.post.pk)
+        self.view(self.post)
+        view_buffer.flush()
+        post.text = 'Исправленный пост'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.views, 1)
+
+    def test_failed_flush_keeps_deltas(self):
+        """Если база недоступна, приращения остаются в буфере."""
+        self.view(self.post)
+        with mock.patch(
+            'django.db.models.query.QuerySet.update',
+            side_effect=OperationalError,
+        ):
+            self.assertEqual(view_buffer.flush(), 0)
+        self.assertEqual(view_buffer.pending(self.post.pk), 1)
+
+    def test_flush_at_exit(self):
+        """При завершении процесса недописанные просмотры сохраняются."""
+        self.view(self.post)
+        flush_at_exit()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 1)
+        self.assertEqual(view_buffer.pending(self.post.pk), 0)
+
+    def test_exit_skips_other_database(self):
+        """Просмотры не пишутся в базу, сменившуюся после их учёта."""
+        self.view(self.post)
+        with mock.patch(
+            'posts.counters._database_name', return_value='other.sqlite3'
+        ), self.assertNumQueries(0):
+            flush_at_exit()
+        self.assertEqual(view_buffer.pending(self.post.pk), 0)
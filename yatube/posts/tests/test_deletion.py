@@ -0,0 +1,139 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.deletion import process_pending, schedule_deletion
+from posts.models import (
+    Comment, DeletionTask, Follow, Group, Mention, Post, PostTag,
+    Recommendation, TrendingScore
+)
+
+User = get_user_model()
+
+
+class DeletionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {number}', group=self.group
+            )
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_user_hidden_then_deleted(self):
+        """Пользователь сразу пропадает из лент, а удаляется пачками."""
+        Post.objects.create(author=self.author, text='#тег для @reader')
+        Recommendation.objects.create(
+            user=self.reader, candidate=self.author, score=1
+        )
+        self.assertTrue(Mention.objects.exists())
+        schedule_deletion(self.author)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(process_pending(batch_size=2), 1)
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(PostTag.objects.exists())
+        self.assertFalse(Mention.objects.exists())
+        self.assertFalse(TrendingScore.objects.exists())
+        self.assertFalse(Recommendation.objects.exists())
+        self.assertFalse(DeletionTask.objects.exists())
+
+    def test_pending_user_is_not_deactivated(self):
+        """Отметка удаления не трогает ``is_active``, а деактивация не
+        прячет профиль."""
+        schedule_deletion(self.author)
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.is_active)
+        self.reader.is_active = False
+        self.reader.save()
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'reader'})
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_group_posts_detached(self):
+        """Посты удалённой группы остаются без группы."""
+        schedule_deletion(self.group)
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        )
+        self.assertEqual(response.status_code, 404)
+        process_pending(batch_size=2)
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group=None).count(), 5)
+        self.assertEqual(
+            TrendingScore.objects.filter(group=None).count(), 5
+        )
+
+    def test_post_deleted(self):
+        """Пост скрывается сразу и удаляется вместе с комментариями."""
+        post = self.posts[0]
+        schedule_deletion(post)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(response.status_code, 404)
+        out = StringIO()
+        call_command('process_deletions', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(Post.objects.count(), 4)
+
+    def test_admin_action(self):
+        """Действие админки ставит посты в очередь на удаление."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'schedule_deletion_action',
+            '_selected_action': [self.posts[1].pk, self.posts[2].pk],
+        })
+        self.assertEqual(Post.objects.visible().count(), 3)
+        self.assertEqual(DeletionTask.objects.count(), 2)
+
+    def test_admin_delete_goes_to_queue(self):
+        """Удаление из админки ставит объект в очередь, а массового
+        удаления в обход очереди нет."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('admin:posts_post_changelist'))
+        choices = response.context['action_form'].fields['action'].choices
+        self.assertNotIn('delete_selected', dict(choices))
+        client.post(
+            reverse('admin:posts_group_delete', args=[self.group.pk]),
+            {'post': 'yes'},
+        )
+        self.assertTrue(Group.objects.filter(pk=self.group.pk).exists())
+        self.assertTrue(
+            DeletionTask.objects.filter(object_id=self.group.pk).exists()
+        )
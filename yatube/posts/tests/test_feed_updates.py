@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.deletion import schedule_deletion
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class NewPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.seen = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.url = reverse('posts:new_posts')
+
+    def count(self, **params):
+        response = self.client.get(
+            self.url, {'since': self.seen.pk, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['count']
+
+    def test_counts_new_posts_per_feed(self):
+        """Новые посты считаются в тех лентах, где они появятся."""
+        self.assertEqual(self.count(feed='index'), 0)
+        self.assertEqual(self.count(feed='follow'), 0)
+        self.assertEqual(self.count(feed='group', key='group'), 0)
+        Post.objects.create(author=self.author, text='Новый')
+        Post.objects.create(
+            author=self.reader, text='В группе', group=self.group
+        )
+        self.assertEqual(self.count(feed='index'), 2)
+        self.assertEqual(self.count(feed='follow'), 1)
+        self.assertEqual(self.count(feed='group', key='group'), 1)
+        self.assertEqual(self.count(feed='profile', key='reader'), 1)
+
+    def test_answered_from_cache(self):
+        """Загруженная лента отвечает без запросов к базе, а после нового
+        поста перечитывается одним запросом."""
+        self.count(feed='index')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(feed='index'), 0)
+        Post.objects.create(author=self.author, text='Новый')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count(feed='index'), 1)
+
+    def test_hidden_and_deleted_posts_dropped(self):
+        """Скрытые и удалённые посты пропадают из лент."""
+        hidden = Post.objects.create(author=self.author, text='Скрытый')
+        deleted = Post.objects.create(author=self.author, text='Удалённый')
+        self.assertEqual(self.count(feed='index'), 2)
+        self.assertEqual(self.count(feed='follow'), 2)
+        schedule_deletion(hidden)
+        deleted.delete()
+        self.assertEqual(self.count(feed='index'), 0)
+        self.assertEqual(self.count(feed='follow'), 0)
+
+    # Пост публикуется внутри запроса, и его запросы не входят в бюджет.
+    @override_settings(QUERY_BUDGET={'ENABLED': False})
+    def test_long_poll_returns_when_post_appears(self):
+        """Ожидающий запрос отвечает, как только появился новый пост."""
+        def publish(seconds):
+            Post.objects.create(author=self.author, text='Новый')
+
+        with mock.patch(
+            'posts.feed_updates.time.sleep', side_effect=publish
+        ) as sleep:
+            self.assertEqual(self.count(feed='index', wait=5), 1)
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_bad_requests(self):
+        """Неизвестная лента — 404, неверные параметры — 400."""
+        self.assertEqual(
+            self.client.get(self.url, {'feed': 'nope'}).status_code, 404
+        )
+        self.assertEqual(
+            self.client.get(self.url, {'since': 'x'}).status_code, 400
+        )
@@ -0,0 +1,163 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts import follow_graph
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(5)
+        ]
+        cls.first, cls.second, *cls.others = cls.users
+        Follow.objects.create(user=cls.first, author=cls.second)
+        Follow.objects.create(user=cls.second, author=cls.first)
+        for user in cls.others:
+            Follow.objects.create(user=cls.first, author=user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookups_without_sql_after_load(self):
+        """После загрузки массивов проверки не ходят в базу."""
+        author_ids = [user.pk for user in self.users]
+        follow_graph.is_following(self.first.pk, author_ids)
+        follow_graph.counts(self.first.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                follow_graph.is_following(self.first.pk, author_ids),
+                set(author_ids[1:]),
+            )
+            self.assertEqual(follow_graph.counts(self.first.pk), (1, 4))
+
+    def test_cache_kept_until_commit(self):
+        """До коммита подписки загруженные записи не сбрасываются."""
+        follow_graph.counts(self.first.pk)
+        Follow.objects.create(user=self.others[0], author=self.first)
+        self.assertEqual(follow_graph.counts(self.first.pk), (1, 4))
+
+    def test_stale_cache_does_not_block_follow(self):
+        """Подписку решает база, даже если кэш считает её уже сделанной."""
+        client = Client()
+        client.force_login(self.others[0])
+        with mock.patch.object(
+            follow_graph, 'followees', return_value=[self.first.pk]
+        ):
+            client.get(
+                reverse('posts:profile_follow', kwargs={'username': 'user0'})
+            )
+        self.assertTrue(
+            Follow.objects.filter(user=self.others[0], author=self.first)
+            .exists()
+        )
+        client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'user0'})
+        )
+        self.assertEqual(
+            Follow.objects.filter(
+                user=self.others[0], author=self.first
+            ).count(),
+            1,
+        )
+
+    def test_profile_loads_counts(self):
+        """Профиль кладёт в кэш счётчики автора."""
+        client = Client()
+        client.get(reverse('posts:profile', kwargs={'username': 'user0'}))
+        self.assertEqual(
+            cache.get(follow_graph._key(follow_graph.COUNTS, self.first.pk)),
+            (1, 4),
+        )
+
+    def test_profile_shows_follow_state(self):
+        """Профиль показывает кнопку подписки и счётчики."""
+        client = Client()
+        client.force_login(self.first)
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': 'user1'})
+        )
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['followers_count'], 1)
+        self.assertContains(response, 'Отписаться')
+
+
+class FollowGraphCommitTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_graph_follows_changes(self):
+        """Подписка и отписка сбрасывают загруженные записи."""
+        follow_graph.counts(self.author.pk)
+        follow_graph.followees(self.reader.pk)
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(follow_graph.counts(self.author.pk), (1, 0))
+        self.assertEqual(
+            follow_graph.is_following(self.reader.pk, [self.author.pk]),
+            {self.author.pk},
+        )
+        self.client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(follow_graph.counts(self.author.pk), (0, 0))
+
+
+class FollowListTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.celebrity = User.objects.create_user(username='celebrity')
+        cls.fans = [
+            User.objects.create_user(username=f'fan{number}')
+            for number in range(5)
+        ]
+        for fan in cls.fans:
+            Follow.objects.create(user=fan, author=cls.celebrity)
+        Follow.objects.create(user=cls.fans[0], author=cls.fans[4])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.fans[0])
+
+    @mock.patch('posts.views.USERS_PER_PAGE', 2)
+    def test_followers_keyset_pages(self):
+        """Подписчики листаются по id подписки, новые сначала."""
+        url = reverse('posts:followers', kwargs={'username': 'celebrity'})
+        seen = []
+        response = self.client.get(url)
+        while True:
+            seen.extend(response.context['users'])
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                break
+            response = self.client.get(url, {'cursor': cursor})
+        self.assertEqual(seen, self.fans[::-1])
+        self.assertEqual(
+            [user.is_followed for user in seen],
+            [True, False, False, False, False],
+        )
+
+    def test_followees(self):
+        """Страница подписок показывает авторов пользователя."""
+        response = self.client.get(
+            reverse('posts:followees', kwargs={'username': 'fan0'})
+        )
+        self.assertEqual(
+            response.context['users'], [self.fans[4], self.celebrity]
+        )
@@ -106,6 +106,16 @@ class PostUpdateForm(TestCase):
         self.assertEqual(new_post.text, form_data['text'])
         self.assertEqual(Post.objects.count(), posts_count)
 
+    def test_invalid_update_not_saved(self):
+        response = self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': ''},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['text'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Новый пост')
+
 
 class PostCommentForm(TestCase):
     @classmethod
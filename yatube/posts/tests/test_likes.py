@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.likes import attach_likes, like, like_counts, unlike
+from posts.models import LikeCounter, Post
+
+User = get_user_model()
+
+
+class LikeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(5)
+        ]
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.other = Post.objects.create(author=cls.author, text='Другой')
+
+    def test_like_counted_once_per_user(self):
+        """Повторный лайк не увеличивает счётчик, снятие уменьшает."""
+        for reader in self.readers:
+            self.assertTrue(like(reader, self.post.pk))
+        self.assertFalse(like(self.readers[0], self.post.pk))
+        self.assertTrue(unlike(self.readers[1], self.post.pk))
+        self.assertFalse(unlike(self.readers[1], self.post.pk))
+        self.assertEqual(like_counts([self.post.pk]), {self.post.pk: 4})
+
+    def test_attach_likes_for_page(self):
+        """Счётчики и лайки зрителя для страницы берутся двумя запросами."""
+        like(self.readers[0], self.other.pk)
+        posts = [self.post, self.other]
+        with self.assertNumQueries(2):
+            attach_likes(posts, self.readers[0])
+        self.assertEqual([post.like_count for post in posts], [0, 1])
+        self.assertEqual([post.liked for post in posts], [False, True])
+
+    def test_like_views(self):
+        """Лайк ставится и снимается POST-запросом."""
+        client = Client()
+        client.force_login(self.readers[0])
+        url = reverse('posts:post_like', kwargs={'post_id': self.post.pk})
+        self.assertEqual(client.get(url).status_code, 405)
+        client.post(url)
+        response = client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.context['post'].like_count, 1)
+        self.assertTrue(response.context['post'].liked)
+        client.post(
+            reverse('posts:post_unlike', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(like_counts([self.post.pk]), {self.post.pk: 0})
+
+    def test_reconcile_command(self):
+        """Команда сверки восстанавливает разошедшиеся счётчики."""
+        like(self.readers[0], self.post.pk)
+        like(self.readers[1], self.post.pk)
+        LikeCounter.objects.update(count=10)
+        out = StringIO()
+        call_command('reconcile_likes', batch_size=1, stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(like_counts([self.post.pk]), {self.post.pk: 2})
@@ -1,7 +1,15 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
 
-from posts.models import Group, Post
+from posts.models import Comment, Group, Post
+from posts.rendering import RENDER_VERSION, render_rows, setup_worker
 
 User = get_user_model()
 NUM_CHAR = 15
@@ -29,3 +37,61 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         expected_name = self.post.text[:NUM_CHAR]
         self.assertEqual(expected_name, str(post))
+
+
+class RenderedTextTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_post_rendered_on_save(self):
+        """При сохранении поста текст превращается в безопасный HTML."""
+        post = Post.objects.create(
+            author=self.user,
+            text='**Жирный** и *курсив* https://example.com\n\n<script>',
+        )
+        self.assertEqual(
+            post.text_html,
+            '<p><strong>Жирный</strong> и <em>курсив</em> '
+            '<a href="https://example.com" rel="nofollow">'
+            'https://example.com</a></p>\n<p>&lt;script&gt;</p>'
+        )
+        self.assertEqual(
+            post.preview, '**Жирный** и *курсив* https://example.com <script>'
+        )
+
+    def test_title_preview_before_rerender(self):
+        """Заголовок старой записи берётся из текста, а не пустого превью."""
+        post = Post.objects.create(author=self.user, text='Старый пост')
+        Post.objects.update(preview='', render_version=0)
+        post.refresh_from_db()
+        self.assertEqual(post.title_preview, 'Старый пост')
+
+    def test_render_in_spawned_worker(self):
+        """Процесс, запущенный через spawn, сам настраивает Django."""
+        executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=setup_worker,
+            initargs=(settings.SETTINGS_MODULE,),
+        )
+        with executor:
+            rendered = executor.submit(render_rows, [(1, '#тег')]).result()
+        self.assertIn(reverse('posts:tag_posts', args=['тег']),
+                      rendered[0][1])
+
+    def test_rerender_command(self):
+        """Команда перерисовывает записи со старой версией правил."""
+        post = Post.objects.create(author=self.user, text='`код`')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='*комментарий*'
+        )
+        Post.objects.update(text_html='', render_version=0)
+        Comment.objects.update(text_html='', render_version=0)
+        call_command('rerender_posts', workers=0, stdout=StringIO())
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(post.text_html, '<p><code>код</code></p>')
+        self.assertEqual(comment.text_html, '<p><em>комментарий</em></p>')
+        self.assertEqual(post.render_version, RENDER_VERSION)
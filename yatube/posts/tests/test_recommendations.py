@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Recommendation
+
+User = get_user_model()
+
+
+class RecommendationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = ['ann', 'bob', 'cat', 'dan', 'eve', 'fox']
+        cls.users = {
+            name: User.objects.create_user(username=name) for name in names
+        }
+        edges = [
+            ('ann', 'bob'), ('ann', 'cat'),
+            ('bob', 'dan'), ('cat', 'dan'),
+            ('eve', 'bob'), ('eve', 'cat'), ('eve', 'fox'),
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=cls.users[user], author=cls.users[author])
+            for user, author in edges
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def recommended(self, name):
+        return list(
+            Recommendation.objects.filter(user=self.users[name])
+            .order_by('-score').values_list('candidate__username', flat=True)
+        )
+
+    def test_friends_of_friends_and_co_follows(self):
+        """Рекомендуются друзья друзей и авторы похожих читателей."""
+        out = StringIO()
+        call_command('compute_recommendations', chunk_size=2, stdout=out)
+        self.assertIn('Сохранено рекомендаций', out.getvalue())
+        # dan — через двух друзей, fox — у eve те же подписки, что у ann.
+        self.assertEqual(self.recommended('ann'), ['dan', 'fox'])
+        self.assertNotIn('ann', self.recommended('ann'))
+        self.assertNotIn('bob', self.recommended('ann'))
+
+    def test_shown_on_follow_page(self):
+        """Рекомендации показываются, пока на автора нет подписки."""
+        call_command('compute_recommendations', stdout=StringIO())
+        client = Client()
+        client.force_login(self.users['ann'])
+        response = client.get(reverse('posts:follow_index'))
+        self.assertIn(self.users['dan'], response.context['who_to_follow'])
+        Follow.objects.create(user=self.users['ann'], author=self.users['dan'])
+        cache.clear()
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': 'ann'})
+        )
+        self.assertNotIn(
+            self.users['dan'], response.context['who_to_follow']
+        )
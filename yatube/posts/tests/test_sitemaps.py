@@ -0,0 +1,119 @@
+import gzip
+import os
+import shutil
+import tempfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from posts import sitemaps
+from posts.models import Group, Post
+
+User = get_user_model()
+SITEMAP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
+@override_settings(SITEMAPS={
+    'ROOT': SITEMAP_ROOT, 'BASE_URL': 'https://example.com',
+    'URLS_PER_FILE': 2,
+})
+class SitemapTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Group.objects.create(title='Группа', slug='group', description='-')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SITEMAP_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(SITEMAP_ROOT, ignore_errors=True)
+        self.posts = [self.create_post() for _ in range(3)]
+
+    def create_post(self):
+        return Post.objects.create(author=self.author, text='Пост')
+
+    def locations(self, name):
+        with gzip.open(os.path.join(SITEMAP_ROOT, name)) as file:
+            root = ElementTree.parse(file).getroot()
+        return [url.find(f'{NS}loc').text for url in root]
+
+    def test_split_files_and_index(self):
+        """Посты делятся на файлы, индекс перечисляет все файлы."""
+        sitemaps.build()
+        self.assertEqual(self.locations('posts-00001.xml.gz'), [
+            f'https://example.com/posts/{post.pk}/'
+            for post in self.posts[:2]
+        ])
+        self.assertEqual(self.locations('profiles-00001.xml.gz'),
+                         ['https://example.com/profile/author/'])
+        index = ElementTree.parse(
+            os.path.join(SITEMAP_ROOT, sitemaps.INDEX_FILE)
+        ).getroot()
+        self.assertEqual(
+            [item.find(f'{NS}loc').text for item in index],
+            ['https://example.com/sitemaps/posts-00001.xml.gz',
+             'https://example.com/sitemaps/posts-00002.xml.gz',
+             'https://example.com/sitemaps/groups-00001.xml.gz',
+             'https://example.com/sitemaps/profiles-00001.xml.gz'],
+        )
+
+    def test_incremental_append(self):
+        """Повторный запуск дописывает только новые посты."""
+        sitemaps.build()
+        first = os.path.join(SITEMAP_ROOT, 'posts-00001.xml.gz')
+        with open(first, 'rb') as file:
+            before = file.read()
+        new = [self.create_post() for _ in range(2)]
+        self.assertEqual(sitemaps.build()['posts'], 2)
+        with open(first, 'rb') as file:
+            self.assertEqual(file.read(), before)
+        self.assertEqual(
+            self.locations('posts-00002.xml.gz'),
+            [f'https://example.com/posts/{post.pk}/'
+             for post in (self.posts[2], new[0])],
+        )
+        self.assertEqual(self.locations('posts-00003.xml.gz'),
+                         [f'https://example.com/posts/{new[1].pk}/'])
+
+    def test_append_replaces_served_file(self):
+        """Дописанный файл подменяет отдаваемый целиком, а не правится
+        на месте."""
+        sitemaps.build()
+        self.create_post()
+        path = os.path.join(SITEMAP_ROOT, 'posts-00002.xml.gz')
+        with open(path, 'rb') as served:
+            sitemaps.build()
+            with gzip.open(served) as file:
+                old = ElementTree.parse(file).getroot()
+        self.assertEqual(len(old), 1)
+        self.assertEqual(len(self.locations('posts-00002.xml.gz')), 2)
+        self.assertFalse([
+            name for name in os.listdir(SITEMAP_ROOT)
+            if name.endswith(sitemaps.TEMP_SUFFIX)
+        ])
+
+    def test_full_rebuild_drops_deleted(self):
+        sitemaps.build()
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[1:]]) \
+            .delete()
+        sitemaps.build(full=True)
+        self.assertEqual(self.locations('posts-00001.xml.gz'),
+                         [f'https://example.com/posts/{self.posts[0].pk}/'])
+        self.assertFalse(
+            os.path.exists(os.path.join(SITEMAP_ROOT, 'posts-00002.xml.gz'))
+        )
+
+    def test_served_as_static_files(self):
+        sitemaps.build()
+        self.assertEqual(self.client.get('/sitemap.xml').status_code, 200)
+        response = self.client.get('/sitemaps/posts-00001.xml.gz')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(
+            self.client.get('/sitemaps/.state.json').status_code, 404
+        )
@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Mention, Post, PostTag
+
+User = get_user_model()
+
+
+class TagIndexTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def tag_names(self, post):
+        return set(post.post_tags.values_list('tag__name', flat=True))
+
+    def test_tags_and_mentions_indexed_on_create(self):
+        """Теги и упоминания попадают в индекс при создании поста."""
+        post = Post.objects.create(
+            author=self.author, text='#Django и #python для @reader @nobody'
+        )
+        self.assertEqual(self.tag_names(post), {'django', 'python'})
+        self.assertEqual(
+            list(post.mentions.values_list('user__username', flat=True)),
+            ['reader'],
+        )
+        self.assertIn(
+            f'href="{reverse("posts:tag_posts", args=["django"])}"',
+            post.text_html,
+        )
+        self.assertIn(
+            f'href="{reverse("posts:profile", args=["reader"])}"',
+            post.text_html,
+        )
+
+    def test_index_updated_incrementally_on_edit(self):
+        """При правке меняется только разница тегов и упоминаний."""
+        post = Post.objects.create(
+            author=self.author, text='#one #two @reader'
+        )
+        kept = PostTag.objects.get(post=post, tag__name='one')
+        post.text = '#one #three'
+        post.save()
+        self.assertEqual(self.tag_names(post), {'one', 'three'})
+        self.assertTrue(PostTag.objects.filter(pk=kept.pk).exists())
+        self.assertFalse(post.mentions.exists())
+
+    def test_tag_feed(self):
+        """Лента тега показывает только посты с этим тегом."""
+        tagged = Post.objects.create(author=self.author, text='про #Django')
+        Post.objects.create(author=self.author, text='без тегов')
+        response = self.client.get(
+            reverse('posts:tag_posts', args=['DJANGO'])
+        )
+        self.assertEqual(list(response.context['page_obj']), [tagged])
+        response = self.client.get(
+            reverse('posts:tag_posts', args=['missing'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_mentions_feed(self):
+        """Лента упоминаний показывает посты, где упомянут пользователь."""
+        post = Post.objects.create(author=self.author, text='привет @reader')
+        Post.objects.create(author=self.author, text='привет всем')
+        response = self.client.get(reverse('posts:mentions'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_rerender_command_rebuilds_index(self):
+        """Перерисовка постов заново строит индекс тегов."""
+        post = Post.objects.create(author=self.author, text='#tag @reader')
+        PostTag.objects.all().delete()
+        Mention.objects.all().delete()
+        call_command('rerender_posts', workers=0, all=True, stdout=StringIO())
+        self.assertEqual(self.tag_names(post), {'tag'})
+        self.assertTrue(post.mentions.filter(user=self.reader).exists())
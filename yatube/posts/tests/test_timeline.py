@@ -0,0 +1,165 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Follow, Group, GroupSubscription, Post
+from posts.timeline import decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class MyFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupSubscription.objects.create(user=cls.reader, group=cls.group)
+        start = timezone.now() - timedelta(days=1)
+        cls.expected = []
+        sources = [
+            (cls.author, None), (cls.stranger, cls.group),
+            (cls.author, cls.group), (cls.stranger, None),
+        ] * 4
+        for number, (author, group) in enumerate(sources):
+            moment = start + timedelta(minutes=number // 2)
+            with mock.patch('django.utils.timezone.now', return_value=moment):
+                post = Post.objects.create(
+                    author=author, group=group, text=f'Пост {number}'
+                )
+            if author == cls.author or group == cls.group:
+                cls.expected.append(post)
+        cls.expected.sort(key=lambda post: (post.pub_date, post.pk))
+        cls.expected.reverse()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_cursor_round_trip(self):
+        """Курсор точно восстанавливает дату и id поста."""
+        post = self.expected[0]
+        self.assertEqual(
+            decode_cursor(encode_cursor(post)), (post.pub_date, post.pk)
+        )
+        self.assertIsNone(decode_cursor('мусор'))
+
+    def test_out_of_range_cursor(self):
+        """Курсор за пределами дат или целых SQLite не роняет ленту."""
+        for cursor in ('99999999999999999999.1', '-99999999999999999.1',
+                       '0.99999999999999999999'):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                response = self.client.get(
+                    reverse('posts:my_feed'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    @mock.patch('posts.views.POSTS_PER_PAGE', 5)
+    def test_merged_pages_without_duplicates(self):
+        """Лента сливает авторов и группы без повторов и пропусков."""
+        seen = []
+        cursor = None
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            response = self.client.get(reverse('posts:my_feed'), params)
+            seen.extend(response.context['page_obj'])
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.expected)
+
+    def test_group_subscription_views(self):
+        """Подписка на группу ставится и снимается со страницы группы."""
+        self.client.get(
+            reverse('posts:group_unsubscribe', kwargs={'slug': 'group'})
+        )
+        self.assertFalse(self.reader.group_subscriptions.exists())
+        self.client.get(
+            reverse('posts:group_subscribe', kwargs={'slug': 'group'})
+        )
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'group'})
+        )
+        self.assertTrue(response.context['subscribed'])
+
+
+class FeedFragmentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        start = timezone.now() - timedelta(days=1)
+        cls.posts = []
+        for number in range(25):
+            moment = start + timedelta(minutes=number)
+            with mock.patch('django.utils.timezone.now', return_value=moment):
+                cls.posts.append(Post.objects.create(
+                    author=cls.author, group=cls.group, text=f'Пост {number}'
+                ))
+        cls.posts.reverse()
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_scroll_continues_page(self):
+        """Фрагменты продолжают страницу до конца ленты без повторов."""
+        for url, feed, key in (
+            (reverse('posts:index'), 'index', ''),
+            (reverse('posts:group_list', args=['group']), 'group', 'group'),
+            (reverse('posts:profile', args=['author']), 'profile', 'author'),
+        ):
+            with self.subTest(feed=feed):
+                response = self.client.get(url)
+                seen = list(response.context['page_obj'])
+                cursor = response.context['next_cursor']
+                self.assertContains(response, 'class="feed-more"')
+                while cursor:
+                    response = self.client.get(
+                        reverse('posts:feed_fragment'),
+                        {'feed': feed, 'key': key, 'cursor': cursor},
+                    )
+                    self.assertNotContains(response, '<html')
+                    seen.extend(response.context['page_obj'])
+                    cursor = response.context['next_cursor']
+                self.assertEqual(seen, self.posts)
+
+    def test_bad_fragment_requests(self):
+        """Без курсора — 400, лента избранного для гостя — 404."""
+        url = reverse('posts:feed_fragment')
+        cursor = encode_cursor(self.posts[0])
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(
+            self.client.get(
+                url, {'feed': 'follow', 'cursor': cursor}
+            ).status_code,
+            404,
+        )
+
+    def test_out_of_range_fragment_cursor(self):
+        """Курсор вне диапазона дат — 400, а не ошибка сервера."""
+        response = self.client.get(
+            reverse('posts:feed_fragment'),
+            {'feed': 'index', 'cursor': '99999999999999999999.1'},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_scroll_keeps_month_navigation(self):
+        """Скрипт прячет только номера страниц, не навигацию по месяцам."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, "querySelectorAll('ul[data-page-numbers]')"
+        )
+        self.assertNotContains(response, 'nav[aria-label=')
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.likes import like
+from posts.models import Comment, Follow, Group, Post, TrendingScore
+from posts.trending import TRENDING_DEFAULTS, weight
+
+User = get_user_model()
+
+
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.quiet = Post.objects.create(author=cls.author, text='Тихий')
+        cls.popular = Post.objects.create(
+            author=cls.author, text='Популярный', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def scores(self):
+        return dict(TrendingScore.objects.values_list('post_id', 'score'))
+
+    def page(self, url):
+        return list(self.client.get(url).context['page_obj'])
+
+    def test_events_raise_score(self):
+        """Комментарии, лайки и подписчики поднимают пост в ленте."""
+        before = self.scores()
+        Comment.objects.create(
+            post=self.popular, author=self.reader, text='Комментарий'
+        )
+        like(self.reader, self.popular.pk)
+        after = self.scores()
+        self.assertEqual(after[self.quiet.pk], before[self.quiet.pk])
+        self.assertGreater(after[self.popular.pk], after[self.quiet.pk])
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertGreater(self.scores()[self.quiet.pk], after[self.quiet.pk])
+        self.assertEqual(
+            self.page(reverse('posts:trending')), [self.popular, self.quiet]
+        )
+
+    def test_group_trending(self):
+        """В популярном группы только посты группы."""
+        self.assertEqual(
+            self.page(reverse('posts:group_trending', args=['group'])),
+            [self.popular],
+        )
+
+    def test_newer_event_outweighs_older(self):
+        """Событие через период полураспада весит вдвое больше."""
+        now = timezone.now()
+        later = now + timedelta(days=1)
+        self.assertAlmostEqual(
+            weight('comment', later) - weight('comment', now), 1.0
+        )
+
+    def test_score_far_from_epoch(self):
+        """Через годы после ``EPOCH`` оценки считаются без переполнения."""
+        moment = TRENDING_DEFAULTS['EPOCH'] + timedelta(days=20 * 365)
+        with mock.patch('django.utils.timezone.now', return_value=moment):
+            post = Post.objects.create(author=self.author, text='Будущий')
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий'
+            )
+            incremental = self.scores()[post.pk]
+            call_command('recompute_trending', stdout=StringIO())
+        self.assertGreater(incremental, weight('comment', moment))
+        self.assertAlmostEqual(self.scores()[post.pk], incremental, places=6)
+
+    def test_recompute_matches_incremental(self):
+        """Пересчёт с нуля даёт те же оценки и убирает старые посты."""
+        Comment.objects.create(
+            post=self.popular, author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        incremental = self.scores()
+        old = timezone.now() - timedelta(days=30)
+        with mock.patch('django.utils.timezone.now', return_value=old):
+            stale = Post.objects.create(author=self.author, text='Старый')
+        call_command('recompute_trending', stdout=StringIO())
+        recomputed = self.scores()
+        self.assertNotIn(stale.pk, recomputed)
+        for post in (self.quiet, self.popular):
+            self.assertAlmostEqual(
+                recomputed[post.pk], incremental[post.pk], places=6
+            )
+
+    def test_recompute_updates_rows_in_place(self):
+        """Пересчёт обновляет оценки окна, а удаляет только старые."""
+        TrendingScore.objects.filter(pk=self.quiet.pk).delete()
+        TrendingScore.objects.filter(pk=self.popular.pk).update(score=0)
+        with CaptureQueriesContext(connection) as queries:
+            call_command('recompute_trending', stdout=StringIO())
+        deletes = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('DELETE')
+        ]
+        self.assertTrue(deletes)
+        for sql in deletes:
+            self.assertIn('"pub_date" <', sql)
+        scores = self.scores()
+        self.assertEqual(set(scores), {self.quiet.pk, self.popular.pk})
+        self.assertGreater(scores[self.popular.pk], 0)
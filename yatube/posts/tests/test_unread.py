@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.backends import FeedMarkerBackend
+from posts.models import FeedMarker, Follow, Post
+from posts.unread import unread_count
+
+User = get_user_model()
+
+
+class UnreadCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.stranger = User.objects.create_user(username='stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def unread(self):
+        return FeedMarker.objects.get(user=self.reader).unread
+
+    def test_counter_bumped_and_reset(self):
+        """Новые посты автора копятся до просмотра ленты."""
+        self.client.get(reverse('posts:follow_index'))
+        Post.objects.create(author=self.author, text='Первый')
+        Post.objects.create(author=self.author, text='Второй')
+        Post.objects.create(author=self.stranger, text='Чужой')
+        self.assertEqual(self.unread(), 2)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['follow_unread'], 2)
+        self.assertContains(response, 'badge')
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(response.context['follow_unread'], 0)
+
+    def test_counter_loaded_with_user(self):
+        """Счётчик приходит вместе с пользователем сессии."""
+        self.client.get(reverse('posts:follow_index'))
+        Post.objects.create(author=self.author, text='Первый')
+        user = FeedMarkerBackend().get_user(self.reader.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(user), 1)
+
+    @mock.patch('posts.unread.UNREAD_CAP', 2)
+    def test_counter_capped(self):
+        """Счётчик не растёт выше предела."""
+        self.client.get(reverse('posts:follow_index'))
+        for number in range(4):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        self.assertEqual(self.unread(), 2)
+
+    @mock.patch('posts.context_processors.UNREAD_CAP', 2)
+    @mock.patch('posts.unread.UNREAD_CAP', 2)
+    def test_badge_at_cap(self):
+        """На пределе счётчик выводится с плюсом, ниже — без."""
+        self.client.get(reverse('posts:follow_index'))
+        Post.objects.create(author=self.author, text='Первый')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '>1</span>')
+        Post.objects.create(author=self.author, text='Второй')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '>2+</span>')
@@ -1,15 +1,33 @@
+import shutil
+import tempfile
+from datetime import date, datetime, timezone
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.db import OperationalError
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
 from django import forms
+from posts import months
+from posts.deletion import schedule_deletion
+from posts.likes import like
 from posts.models import Post, Group, Follow
+from posts.views import POSTS_PER_PAGE
 
 User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class TaskPagesTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -209,6 +227,150 @@ class PaginatorViewsTest(TestCase):
                     self.assertEqual(len(response.context['page_obj']), key)
 
 
+class ElidedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='oleiip')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {number}')
+            for number in range(POSTS_PER_PAGE * 30)
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Новый пост')
+        Post.objects.filter(text__in=['Пост 0', 'Пост 1']).update(
+            pub_date=datetime(2022, 1, 15, tzinfo=timezone.utc)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_elided_page_range(self):
+        """Выводится только окно страниц вокруг текущей."""
+        response = self.guest_client.get(reverse('posts:index') + '?page=15')
+        self.assertContains(response, '…', count=2)
+        for page in (1, 2, 12, 14, 16, 18, 30, 31):
+            with self.subTest(page=page):
+                self.assertContains(response, f'?page={page}"')
+        self.assertNotContains(response, '?page=5"')
+
+    def test_month_navigation(self):
+        """Ссылка на месяц ведёт на страницу с его первым постом."""
+        response = self.guest_client.get(reverse('posts:index'))
+        months = list(response.context['months'])
+        self.assertEqual(months[-1], (date(2022, 1, 1), 30))
+        self.assertEqual(months[0][1], 1)
+
+    def test_month_index_shifted_on_new_post(self):
+        """Новый пост сдвигает индекс месяцев ленты без перестройки."""
+        list(self.guest_client.get(reverse('posts:index')).context['months'])
+        Post.objects.create(author=self.user, text='Ещё один пост')
+        response = self.guest_client.get(reverse('posts:profile', kwargs={
+            'username': self.user.username
+        }))
+        self.assertEqual(list(response.context['months'])[-1][1], 31)
+        posts = Post.objects.none()
+        with self.assertNumQueries(0):
+            index = months.month_index(months.feed_key(), posts)
+        self.assertEqual(index[-1], (date(2022, 1, 1), POSTS_PER_PAGE * 30))
+        self.assertEqual(index[0][1], 0)
+
+    def test_month_index_reset_on_hidden_post(self):
+        """Скрытый пост сбрасывает индекс месяцев ленты."""
+        list(self.guest_client.get(reverse('posts:index')).context['months'])
+        schedule_deletion(Post.objects.get(text='Пост 0'))
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(list(response.context['months'])[-1][1], 30)
+        self.assertEqual(
+            months.month_index(months.feed_key(), Post.objects.visible())[-1],
+            (date(2022, 1, 1), POSTS_PER_PAGE * 30 - 1),
+        )
+
+
+@override_settings(QUERY_BUDGET={'ENABLED': True, 'ACTION': 'raise'})
+class QueryBudgetViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for number in range(POSTS_PER_PAGE + 3):
+            cls.post = Post.objects.create(
+                author=cls.author, text=f'Пост {number} #тег',
+                group=cls.group,
+            )
+        for user in (cls.author, cls.reader):
+            cls.post.comments.create(author=user, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_pages_within_budget(self):
+        """Страницы укладываются в бюджет SQL-запросов."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_create'),
+            reverse('posts:follow_index'),
+            reverse('posts:mentions'),
+            reverse('posts:followers', kwargs={'username': self.author}),
+            reverse('posts:followees', kwargs={'username': self.reader}),
+            reverse('posts:trending'),
+            reverse('posts:my_feed'),
+            reverse('posts:tag_posts', kwargs={'tag': 'тег'}),
+        ]
+        for client in (self.guest_client, self.reader_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    cache.clear()
+                    client.get(url)
+        self.author_client.get(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+        )
+
+    def test_actions_within_budget(self):
+        """Действия пользователя укладываются в бюджет SQL-запросов."""
+        actions = {
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}):
+                {'text': 'Ещё комментарий'},
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'}):
+                {},
+            reverse('posts:profile_follow', kwargs={'username': 'author'}):
+                {},
+            reverse('posts:post_create'): {
+                'text': 'Новый пост #свежий', 'group': self.group.pk,
+            },
+            reverse('posts:group_subscribe', kwargs={'slug': 'test-slug'}):
+                {},
+            reverse('posts:group_unsubscribe', kwargs={'slug': 'test-slug'}):
+                {},
+            reverse('posts:post_like', kwargs={'post_id': self.post.pk}): {},
+            reverse('posts:post_unlike', kwargs={'post_id': self.post.pk}):
+                {},
+        }
+        for url, data in actions.items():
+            with self.subTest(url=url):
+                self.reader_client.post(url, data)
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+        for data in ({'text': 'Исправленный пост'},
+                     {'text': 'Пост #новый', 'group': self.group.pk}):
+            with self.subTest(data=data):
+                self.author_client.post(edit_url, data)
+
+
 class CacheTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -243,6 +405,26 @@ class CacheTest(TestCase):
         third_time = self.guest_client.get(self.INDEX)
         self.assertNotEqual(first_time.content, third_time.content)
 
+    def test_cached_index_not_shared_between_users(self):
+        """Фрагмент главной общий, а лайки и CSRF у каждого зрителя свои."""
+        reader = User.objects.create_user(username='reader')
+        like(reader, self.post.pk)
+        reader_client = Client()
+        reader_client.force_login(reader)
+        author_client = Client()
+        author_client.force_login(self.user)
+        response = reader_client.get(self.INDEX)
+        self.assertContains(response, 'btn-sm btn-danger')
+        reader_token = response.context['csrf_token']
+        Post.objects.filter(pk=self.post.pk).update(
+            text_html='<p>Правка мимо кэша</p>'
+        )
+        response = author_client.get(self.INDEX)
+        self.assertNotContains(response, 'Правка мимо кэша')
+        self.assertNotContains(response, 'btn-sm btn-danger')
+        self.assertContains(response, 'btn-sm btn-outline-danger')
+        self.assertNotContains(response, str(reader_token))
+
 
 class CommentTest(TestCase):
     @classmethod
@@ -342,3 +524,131 @@ class FollowViewsTest(TestCase):
         response = self.authorized_client.get(
             reverse('posts:follow_index'))
         self.assertNotIn(post, response.context['page_obj'].object_list)
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AUTHOR')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Первый пост'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.INDEX = reverse('posts:index')
+        cache.clear()
+
+    @override_settings(FEED_CACHE={
+        'TIMEOUT': 0, 'STALE_WHILE_REVALIDATE': 0, 'STALE_IF_ERROR': 60,
+    })
+    def test_stale_if_error(self):
+        """При ошибке базы данных отдаётся сохранённая копия ленты."""
+        first = self.guest_client.get(self.INDEX)
+        with mock.patch('posts.views.Paginator.get_page',
+                        side_effect=OperationalError):
+            second = self.guest_client.get(self.INDEX)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertIn('111', second['Warning'])
+
+    @override_settings(FEED_CACHE={
+        'TIMEOUT': 0, 'STALE_WHILE_REVALIDATE': 0, 'STALE_IF_ERROR': 0,
+    })
+    def test_error_without_copy(self):
+        """Без сохранённой копии ошибка базы данных не скрывается."""
+        with mock.patch('posts.views.Paginator.get_page',
+                        side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                self.guest_client.get(self.INDEX)
+
+    @override_settings(FEED_CACHE={
+        'TIMEOUT': 0, 'STALE_WHILE_REVALIDATE': 60, 'STALE_IF_ERROR': 0,
+    })
+    def test_stale_while_revalidate(self):
+        """Устаревшая копия отдаётся сразу, а страница обновляется в фоне."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        self.guest_client.get(url)
+        # Правка мимо сигналов: копия не сброшена, а только устарела.
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Второй пост', text_html='<p>Второй пост</p>'
+        )
+        with mock.patch('core.decorators._refresh_executor.submit',
+                        side_effect=lambda fn, *args: fn(*args)) as submit:
+            with mock.patch('core.decorators.connections'):
+                stale = self.guest_client.get(url)
+        submit.assert_called_once()
+        self.assertIn('110', stale['Warning'])
+        self.assertNotContains(stale, 'Второй пост')
+        with mock.patch('core.decorators._refresh_executor.submit'):
+            refreshed = self.guest_client.get(url)
+        self.assertContains(refreshed, 'Второй пост')
+
+    @override_settings(FEED_CACHE={
+        'TIMEOUT': 60, 'STALE_WHILE_REVALIDATE': 0, 'STALE_IF_ERROR': 0,
+    })
+    def test_write_invalidates_copy(self):
+        """Новый пост сразу виден, даже если копия ленты свежая."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        self.guest_client.get(url)
+        Post.objects.create(author=self.user, text='Второй пост')
+        self.assertContains(self.guest_client.get(url), 'Второй пост')
+
+    @override_settings(FEED_CACHE={
+        'TIMEOUT': 60, 'STALE_WHILE_REVALIDATE': 0, 'STALE_IF_ERROR': 0,
+    })
+    def test_write_invalidates_only_its_feeds(self):
+        """Пост сбрасывает свои ленты, а лайк — ни одной."""
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        group_url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        other_url = reverse('posts:group_list', kwargs={'slug': 'other'})
+        for url in (self.INDEX, group_url, other_url):
+            self.guest_client.get(url)
+        reader = User.objects.create_user(username='reader')
+        like(reader, self.post.pk)
+        self.assertIn('Age', self.guest_client.get(self.INDEX))
+        Post.objects.create(author=self.user, text='В группе', group=group)
+        self.assertContains(self.guest_client.get(group_url), 'В группе')
+        self.assertNotIn('Age', self.guest_client.get(self.INDEX))
+        self.assertIn('Age', self.guest_client.get(other_url))
+        self.assertEqual(other.posts.count(), 0)
+
+    @override_settings(FEED_CACHE={
+        'TIMEOUT': 60, 'STALE_WHILE_REVALIDATE': 0, 'STALE_IF_ERROR': 60,
+    })
+    def test_error_copy_survives_write(self):
+        """Запись сбрасывает копию, но не аварийную страницу ленты."""
+        self.guest_client.get(self.INDEX)
+        Post.objects.create(author=self.user, text='Второй пост')
+        with mock.patch('posts.views.Paginator.get_page',
+                        side_effect=OperationalError):
+            response = self.guest_client.get(self.INDEX)
+        self.assertIn('111', response['Warning'])
+        self.assertNotContains(response, 'Второй пост')
+
+    @override_settings(FEED_CACHE={
+        'TIMEOUT': 60, 'STALE_WHILE_REVALIDATE': 0, 'STALE_IF_ERROR': 0,
+    })
+    def test_authenticated_not_cached(self):
+        """Страницы пользователей не кэшируются, копия хранит заголовки."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Правка', text_html='<p>Правка</p>'
+        )
+        self.assertContains(client.get(url), 'Правка')
+        first = self.guest_client.get(url)
+        second = self.guest_client.get(url)
+        self.assertIn('Age', second)
+        self.assertEqual(first['Content-Type'], second['Content-Type'])
+        self.assertEqual(first.get('X-Frame-Options'),
+                         second.get('X-Frame-Options'))
@@ -0,0 +1,70 @@
+"""Лента из нескольких источников, слитая по ``(pub_date, id)``.
+
+Каждый источник — выборка постов, которая читается пачками по ключу
+``(pub_date, id)`` от курсора вниз. Потоки сливаются кучей
+(``heapq.merge``), повторы одного поста из разных источников
+отбрасываются. Из каждого источника читается не больше строк, чем
+нужно для страницы.
+"""
+import heapq
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Больший id не влезет в целое SQLite и уронит запрос.
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(post):
+    micros = (post.pub_date - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}.{post.pk}'
+
+
+def decode_cursor(value):
+    """Разбирает курсор ``микросекунды.id``; неверный курсор — ``None``."""
+    try:
+        micros, pk = (int(part) for part in value.split('.'))
+        pub_date = EPOCH + timedelta(microseconds=micros)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+    if not 0 <= pk <= MAX_PK:
+        return None
+    return pub_date, pk
+
+
+def keyset_stream(queryset, cursor, chunk_size):
+    """Посты выборки от новых к старым, начиная после курсора."""
+    queryset = queryset.order_by('-pub_date', '-pk')
+    while True:
+        page = queryset
+        if cursor is not None:
+            pub_date, pk = cursor
+            page = page.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        posts = list(page[:chunk_size])
+        yield from posts
+        if len(posts) < chunk_size:
+            return
+        cursor = posts[-1].pub_date, posts[-1].pk
+
+
+def merged_page(sources, cursor, per_page):
+    """Страница слитой ленты и курсор следующей страницы."""
+    streams = [
+        keyset_stream(queryset, cursor, per_page + 1) for queryset in sources
+    ]
+    merged = heapq.merge(
+        *streams, key=lambda post: (post.pub_date, post.pk), reverse=True
+    )
+    posts, seen = [], set()
+    for post in merged:
+        if post.pk in seen:
+            continue
+        if len(posts) == per_page:
+            return posts, encode_cursor(posts[-1])
+        seen.add(post.pk)
+        posts.append(post)
+    return posts, None
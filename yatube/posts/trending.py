@@ -0,0 +1,180 @@
+"""Популярные посты: оценка с экспоненциальным затуханием.
+
+Оценка поста — сумма весов событий (публикация, комментарии, лайки,
+новые подписчики автора), каждый из которых затухает с периодом
+полураспада ``HALF_LIFE``. Вместо того чтобы уменьшать все оценки со
+временем, вклад нового события умножается на ``2 ** (t / HALF_LIFE)``,
+где ``t`` отсчитывается от ``EPOCH``: порядок постов при этом тот же.
+Сигналы прибавляют вклад одним UPDATE, а команда ``recompute_trending``
+пересчитывает оценки с нуля, обновляя строки на месте, и убирает посты
+старше ``WINDOW``.
+
+Сам вклад через тысячу периодов не поместится во ``float``, поэтому
+хранится его двоичный логарифм ``log2(W) + t / HALF_LIFE``, а суммы
+считаются как ``log2(2 ** a + 2 ** b)``. Логарифм растёт линейно, и
+порядок постов не меняется.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Greatest, Log, Power
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Like, Post, TrendingScore
+
+TRENDING_DEFAULTS = {
+    'EPOCH': datetime(2026, 1, 1, tzinfo=timezone.utc),
+    'HALF_LIFE': 24 * 60 * 60,
+    'WINDOW': timedelta(days=7),
+    'WEIGHTS': {
+        'post': 1.0,
+        'comment': 3.0,
+        'like': 1.0,
+        'follow': 0.5,
+    },
+}
+BATCH_SIZE = 500
+
+
+def _options():
+    return {**TRENDING_DEFAULTS, **getattr(settings, 'TRENDING', {})}
+
+
+def weight(event, moment, options=None):
+    """Двоичный логарифм вклада события ``event`` в момент ``moment``."""
+    options = options or _options()
+    elapsed = (moment - options['EPOCH']).total_seconds()
+    return (
+        math.log2(options['WEIGHTS'][event])
+        + elapsed / options['HALF_LIFE']
+    )
+
+
+def log_add(first, second):
+    """``log2(2 ** first + 2 ** second)`` без переполнения."""
+    return max(first, second) + math.log2(1 + 2 ** -abs(first - second))
+
+
+def _add_to_score(value):
+    """То же, что ``log_add``, для оценки в UPDATE."""
+    value = Value(value, output_field=FloatField())
+    two = Value(2.0, output_field=FloatField())
+    return Greatest(F('score'), value) + Log(
+        two, Value(1.0) + Power(two, -Abs(F('score') - value))
+    )
+
+
+def window_start():
+    return timezone.now() - _options()['WINDOW']
+
+
+def add_post(post):
+    TrendingScore.objects.create(
+        post=post,
+        group_id=post.group_id,
+        pub_date=post.pub_date,
+        score=weight('post', post.pub_date),
+    )
+
+
+def move_post(post):
+    TrendingScore.objects.filter(post=post).update(group_id=post.group_id)
+
+
+def bump_post(post_id, event):
+    """Прибавляет к оценке поста вклад события, случившегося сейчас."""
+    TrendingScore.objects.filter(post_id=post_id).update(
+        score=_add_to_score(weight(event, timezone.now()))
+    )
+
+
+def bump_author(author_id, event):
+    """Прибавляет вклад события всем свежим постам автора."""
+    TrendingScore.objects.filter(post__author_id=author_id).update(
+        score=_add_to_score(weight(event, timezone.now()))
+    )
+
+
+def trending_links(group=None):
+    """Оценки свежих постов, от самых популярных."""
+    scores = TrendingScore.objects.filter(pub_date__gte=window_start())
+    if group is not None:
+        scores = scores.filter(group=group)
+    return scores
+
+
+def _event_scores(posts, since, options):
+    """Суммирует вклады комментариев, лайков и подписок окна по постам."""
+    scores = {}
+    authors = defaultdict(list)
+    for pk, (author_id, _, pub_date) in posts.items():
+        authors[author_id].append((pk, pub_date))
+        scores[pk] = weight('post', pub_date, options)
+    for model, event in ((Comment, 'comment'), (Like, 'like')):
+        rows = model.objects.filter(
+            post__pub_date__gte=since
+        ).values_list('post_id', 'created')
+        for post_id, created in rows.iterator():
+            if post_id in posts:
+                scores[post_id] = log_add(
+                    scores[post_id], weight(event, created, options)
+                )
+    follows = Follow.objects.filter(
+        created__gte=since
+    ).values_list('author_id', 'created')
+    for author_id, created in follows.iterator():
+        for pk, pub_date in authors.get(author_id, ()):
+            if pub_date <= created:
+                scores[pk] = log_add(
+                    scores[pk], weight('follow', created, options)
+                )
+    return scores
+
+
+def _upsert(posts, items):
+    """Обновляет оценки пачки постов и добавляет недостающие."""
+    rows = [
+        TrendingScore(
+            post_id=pk,
+            group_id=posts[pk][1],
+            pub_date=posts[pk][2],
+            score=score,
+        )
+        for pk, score in items
+    ]
+    with transaction.atomic():
+        existing = set(
+            TrendingScore.objects.filter(
+                post_id__in=[row.post_id for row in rows]
+            ).values_list('post_id', flat=True)
+        )
+        TrendingScore.objects.bulk_update(
+            [row for row in rows if row.post_id in existing],
+            ['group', 'pub_date', 'score'],
+        )
+        # Оценку нового поста мог уже создать сигнал.
+        TrendingScore.objects.bulk_create(
+            [row for row in rows if row.post_id not in existing],
+            ignore_conflicts=True,
+        )
+
+
+def recompute():
+    """Пересчитывает оценки всех постов окна и возвращает их число."""
+    options = _options()
+    since = timezone.now() - options['WINDOW']
+    posts = {
+        pk: rest for pk, *rest in Post.objects.filter(
+            pub_date__gte=since
+        ).values_list('pk', 'author_id', 'group_id', 'pub_date').iterator()
+    }
+    scores = _event_scores(posts, since, options)
+    items = list(scores.items())
+    for start in range(0, len(items), BATCH_SIZE):
+        _upsert(posts, items[start:start + BATCH_SIZE])
+    TrendingScore.objects.filter(pub_date__lt=since).delete()
+    return len(scores)
@@ -0,0 +1,45 @@
+"""Счётчик непрочитанных постов в ленте избранных авторов.
+
+Счётчик не считается запросом ``COUNT`` при показе страницы: каждый
+новый пост одним UPDATE увеличивает его всем подписчикам автора (но не
+выше ``UNREAD_CAP``), а просмотр ленты обнуляет. Подписчики, ни разу
+не открывавшие ленту, маркера не имеют и счётчик не получают.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from posts.models import FeedMarker, Follow
+
+# Больше этого числа показывается как «99+», точнее считать незачем.
+UNREAD_CAP = 99
+
+
+def bump(post):
+    """Увеличивает счётчики подписчиков автора нового поста."""
+    FeedMarker.objects.filter(
+        user__in=Follow.objects.filter(author_id=post.author_id).values(
+            'user_id'
+        ),
+        unread__lt=UNREAD_CAP,
+    ).update(unread=F('unread') + 1)
+
+
+def mark_seen(user):
+    """Обнуляет счётчик пользователя, открывшего ленту."""
+    now = timezone.now()
+    if not FeedMarker.objects.filter(user=user).update(
+        unread=0, last_seen=now
+    ):
+        FeedMarker.objects.bulk_create(
+            [FeedMarker(user=user, last_seen=now)], ignore_conflicts=True
+        )
+    # Страница выводится с уже загруженным маркером, обновляем и его.
+    user.feed_marker = FeedMarker(user=user, last_seen=now)
+
+
+def unread_count(user):
+    """Счётчик из маркера, загруженного вместе с пользователем сессии."""
+    try:
+        return user.feed_marker.unread
+    except FeedMarker.DoesNotExist:
+        return 0
@@ -6,13 +6,40 @@ app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/trending/',
+         views.group_trending, name='group_trending'),
+    path('trending/', views.trending_posts, name='trending'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
+    path('posts/<int:post_id>/like/', views.post_like, name='post_like'),
+    path('posts/<int:post_id>/unlike/',
+         views.post_unlike, name='post_unlike'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('feed/', views.my_feed, name='my_feed'),
+    path('updates/', views.new_posts, name='new_posts'),
+    path('more/', views.feed_fragment, name='feed_fragment'),
+    path('group/<slug:slug>/subscribe/',
+         views.group_subscribe, name='group_subscribe'),
+    path('group/<slug:slug>/unsubscribe/',
+         views.group_unsubscribe, name='group_unsubscribe'),
+    path('tags/<str:tag>/', views.tag_posts, name='tag_posts'),
+    path('mentions/', views.mentions, name='mentions'),
+    path('sitemap.xml', views.sitemap, name='sitemap'),
+    path('sitemaps/<str:path>', views.sitemap, name='sitemap_file'),
+    path(
+        'profile/<str:username>/followers/',
+        views.followers,
+        name='followers'
+    ),
+    path(
+        'profile/<str:username>/following/',
+        views.followees,
+        name='followees'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
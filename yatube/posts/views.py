@@ -1,69 +1,250 @@
 from django.core.paginator import Paginator
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.utils.cache import add_never_cache_headers
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST, require_safe
+from core import media
+from core.decorators import query_budget, stale_while_revalidate
+from posts import feed_updates, follow_graph, sitemaps, trending, unread
+from posts.feed_cache import (
+    fragment_feeds, group_feeds, index_feeds, profile_feeds
+)
+from posts.counters import record_view
 from posts.forms import PostForm, CommentForm
-from posts.models import Post, Group, User, Follow
+from posts.likes import attach_likes, like, unlike
+from posts.months import feed_key, month_pages
+from posts.models import (
+    Follow, Group, GroupSubscription, Post, Recommendation, Tag, User
+)
+from posts.timeline import decode_cursor, encode_cursor, merged_page
 
 POSTS_PER_PAGE = 10
+USERS_PER_PAGE = 50
+RECOMMENDATIONS_SHOWN = 5
 
 
+def who_to_follow(user):
+    """Рекомендованные авторы, на которых пользователь ещё не подписан."""
+    if not user.is_authenticated:
+        return []
+    return [
+        recommendation.candidate
+        for recommendation in Recommendation.objects.filter(
+            user=user, candidate__is_active=True,
+            candidate__pending_deletion__isnull=True,
+        ).exclude(
+            candidate__following__user=user
+        ).select_related('candidate').order_by('-score')[
+            :RECOMMENDATIONS_SHOWN
+        ]
+    ]
+
+
+@query_budget(7)
+@stale_while_revalidate(index_feeds)
 def index(request):
-    posts = Post.objects.select_related('author', 'group')
+    posts = Post.objects.visible().select_related('author', 'group')
     paginator = Paginator(posts, POSTS_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = attach_likes(page_obj.object_list, request.user)
 
     context = {
         'page_obj': page_obj,
+        'next_cursor': scroll_cursor(page_obj),
+        'months': month_pages(feed_key(), posts, POSTS_PER_PAGE),
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(9)
+@stale_while_revalidate(group_feeds)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
+    group = get_object_or_404(Group, slug=slug, pending_deletion=False)
+    posts = group.posts.visible().select_related('author')
     paginator = Paginator(posts, POSTS_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = attach_likes(page_obj.object_list, request.user)
     context = {
         'group': group,
+        'subscribed': request.user.is_authenticated and (
+            group.subscriptions.filter(user=request.user).exists()
+        ),
         'page_obj': page_obj,
+        'next_cursor': scroll_cursor(page_obj),
+        'months': month_pages(
+            feed_key(group_id=group.pk), posts, POSTS_PER_PAGE
+        ),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(12)
+@stale_while_revalidate(profile_feeds)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group')
+    author = get_object_or_404(
+        User, username=username, pending_deletion__isnull=True
+    )
+    posts = author.posts.visible().select_related('group')
     paginator = Paginator(posts, POSTS_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
-    else:
-        following = False
+    page_obj.object_list = attach_likes(page_obj.object_list, request.user)
     context = {
-        'following': following,
+        **follow_graph.profile_state(request.user.pk, author.pk),
         'author': author,
+        'who_to_follow': who_to_follow(request.user),
         'page_obj': page_obj,
+        'next_cursor': scroll_cursor(page_obj),
+        'months': month_pages(
+            feed_key(author_id=author.pk), posts, POSTS_PER_PAGE
+        ),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def follow_list_page(request, links, field):
+    """Страница пользователей из подписок, листаемая по id подписки.
+
+    Возвращает пользователей с отметкой ``is_followed`` для зрителя
+    и курсор следующей страницы.
+    """
+    cursor = request.GET.get('cursor', '')
+    if cursor.isdigit():
+        links = links.filter(pk__lt=int(cursor))
+    rows = list(
+        links.select_related(field).order_by('-pk')[:USERS_PER_PAGE + 1]
+    )
+    next_cursor = None
+    if len(rows) > USERS_PER_PAGE:
+        rows = rows[:USERS_PER_PAGE]
+        next_cursor = rows[-1].pk
+    users = [getattr(row, field) for row in rows]
+    followed = follow_graph.is_following(
+        request.user.pk, [user.pk for user in users]
+    )
+    for user in users:
+        user.is_followed = user.pk in followed
+    return users, next_cursor
+
+
+@query_budget(5)
+def followers(request, username):
+    author = get_object_or_404(
+        User, username=username, pending_deletion__isnull=True
+    )
+    users, next_cursor = follow_list_page(
+        request,
+        author.following.filter(user__pending_deletion__isnull=True),
+        'user',
+    )
+    context = {
+        'author': author,
+        'users': users,
+        'next_cursor': next_cursor,
+        'title': f'Подписчики {author.get_full_name() or author.username}',
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+@query_budget(5)
+def followees(request, username):
+    author = get_object_or_404(
+        User, username=username, pending_deletion__isnull=True
+    )
+    users, next_cursor = follow_list_page(
+        request,
+        author.follower.filter(author__pending_deletion__isnull=True),
+        'author',
+    )
+    context = {
+        'author': author,
+        'users': users,
+        'next_cursor': next_cursor,
+        'title': f'Подписки {author.get_full_name() or author.username}',
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def linked_posts_page(request, links, ordering='-pub_date'):
+    """Страница постов, найденных через индекс тегов, упоминаний и т. п."""
+    links = links.filter(
+        post__pending_deletion=False,
+        post__author__pending_deletion__isnull=True,
+    ).select_related('post__author', 'post__group').order_by(ordering)
+    paginator = Paginator(links, POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = attach_likes(
+        [link.post for link in page_obj.object_list], request.user
+    )
+    return page_obj
+
+
+@query_budget(7)
+def tag_posts(request, tag):
+    tag = get_object_or_404(Tag, name=tag.lower())
+    context = {
+        'tag': tag,
+        'page_obj': linked_posts_page(request, tag.post_tags.all()),
+    }
+    return render(request, 'posts/tag_posts.html', context)
+
+
+@query_budget(6)
+@login_required
+def mentions(request):
+    context = {
+        'page_obj': linked_posts_page(request, request.user.mentions.all()),
+    }
+    return render(request, 'posts/mentions.html', context)
+
+
+@query_budget(6)
+@stale_while_revalidate(index_feeds)
+def trending_posts(request):
+    context = {
+        'page_obj': linked_posts_page(
+            request, trending.trending_links(), '-score'
+        ),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@query_budget(8)
+@stale_while_revalidate(group_feeds)
+def group_trending(request, slug):
+    group = get_object_or_404(Group, slug=slug, pending_deletion=False)
+    context = {
+        'group': group,
+        'page_obj': linked_posts_page(
+            request, trending.trending_links(group), '-score'
+        ),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@query_budget(7)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.visible().select_related('author', 'group'), pk=post_id
+    )
+    attach_likes([post], request.user)
+    if not getattr(request, 'cache_warming', False):
+        record_view(post)
     form = CommentForm()
     context = {
         'post': post,
         'form': form,
-        'comments': post.comments.all(),
+        'comments': post.comments.filter(
+            author__pending_deletion__isnull=True
+        ).select_related('author'),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(10)
 @login_required
 def post_create(request):
     if request.method == 'POST':
@@ -80,18 +261,19 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(12)
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    if post.author == request.user:
-        if request.method == 'POST':
-            form = PostForm(request.POST,
-                            files=request.FILES or None,
-                            instance=post)
-            if form.is_valid:
-                form.save()
-                return redirect('posts:post_detail', post_id)
-        form = PostForm(instance=post)
+    post = get_object_or_404(Post.objects.visible(), pk=post_id)
+    if post.author_id == request.user.pk:
+        # Автор уже загружен: сигналам записи он нужен без запроса.
+        post.author = request.user
+        form = PostForm(request.POST or None,
+                        files=request.FILES or None,
+                        instance=post)
+        if form.is_valid():
+            form.save()
+            return redirect('posts:post_detail', post_id)
         context = {
             'form': form,
             'is_edit': True,
@@ -102,9 +284,10 @@ def post_edit(request, post_id):
     return redirect('posts:post_detail', post_id)
 
 
+@query_budget(5)
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.visible(), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -114,20 +297,163 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+# Первый лайк в части счётчика создаёт её и повторяет UPDATE.
+@query_budget(9, allow_duplicates=True)
+@login_required
+@require_POST
+def post_like(request, post_id):
+    post = get_object_or_404(Post.objects.visible(), pk=post_id)
+    like(request.user, post.pk)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@query_budget(6, allow_duplicates=True)
+@login_required
+@require_POST
+def post_unlike(request, post_id):
+    unlike(request.user, post_id)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@query_budget(9)
 @login_required
 def follow_index(request):
     # информация о текущем пользователе доступна в переменной request.user
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = Post.objects.visible().filter(
+        author__following__user=request.user
+    ).select_related('author', 'group')
     paginator = Paginator(posts, POSTS_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = attach_likes(page_obj.object_list, request.user)
+    unread.mark_seen(request.user)
     context = {
         'posts': posts,
         'page_obj': page_obj,
+        'next_cursor': scroll_cursor(page_obj),
+        'who_to_follow': who_to_follow(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(8)
+@login_required
+def my_feed(request):
+    """Посты избранных авторов и групп, на которые подписан пользователь."""
+    posts = Post.objects.visible().select_related('author', 'group')
+    sources = [
+        posts.filter(author__following__user=request.user),
+        posts.filter(
+            group__subscriptions__user=request.user,
+            group__pending_deletion=False,
+        ),
+    ]
+    page, next_cursor = merged_page(
+        sources, decode_cursor(request.GET.get('cursor')), POSTS_PER_PAGE
+    )
+    context = {
+        'page_obj': attach_likes(page, request.user),
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/my_feed.html', context)
+
+
+def _feed_object(feed, key):
+    """Группа или автор ленты ``feed``; у общих лент объекта нет."""
+    if feed == 'group':
+        return get_object_or_404(Group, slug=key, pending_deletion=False)
+    if feed == 'profile':
+        return get_object_or_404(
+            User, username=key, pending_deletion__isnull=True
+        )
+    if feed in ('index', 'follow'):
+        return None
+    raise Http404
+
+
+def scroll_cursor(page_obj):
+    """Курсор, с которого бесконечная прокрутка продолжит страницу."""
+    if not page_obj.has_next() or not page_obj.object_list:
+        return None
+    return encode_cursor(page_obj.object_list[-1])
+
+
+@query_budget(4)
+def new_posts(request):
+    """Сколько постов новее ``since`` появилось в ленте ``feed``.
+
+    С параметром ``wait`` ответ откладывается, пока новые посты не
+    появятся или не пройдёт ``wait`` секунд.
+    """
+    feed = request.GET.get('feed', 'index')
+    try:
+        since = int(request.GET.get('since', 0))
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        return HttpResponseBadRequest()
+    if feed == 'follow' and not request.user.is_authenticated:
+        return JsonResponse({'count': 0})
+    obj = _feed_object(feed, request.GET.get('key'))
+    author_ids = ()
+    if feed == 'follow':
+        author_ids = follow_graph.followees(request.user.pk)
+    count = feed_updates.wait_for_newer(
+        lambda: feed_updates.feed_heads(feed, obj, author_ids), since, wait
+    )
+    response = JsonResponse({'count': count})
+    add_never_cache_headers(response)
+    return response
+
+
+@query_budget(6)
+@stale_while_revalidate(fragment_feeds)
+def feed_fragment(request):
+    """Следующие посты ленты без обёртки страницы: для прокрутки."""
+    feed = request.GET.get('feed', 'index')
+    key = request.GET.get('key')
+    cursor = decode_cursor(request.GET.get('cursor'))
+    if cursor is None:
+        return HttpResponseBadRequest()
+    obj = _feed_object(feed, key)
+    posts = Post.objects.visible().select_related('author', 'group')
+    if feed == 'group':
+        posts = posts.filter(group=obj)
+    elif feed == 'profile':
+        posts = posts.filter(author=obj)
+    elif feed == 'follow':
+        if not request.user.is_authenticated:
+            raise Http404
+        posts = posts.filter(author__following__user=request.user)
+    page, next_cursor = merged_page([posts], cursor, POSTS_PER_PAGE)
+    context = {
+        'page_obj': attach_likes(page, request.user),
+        'next_cursor': next_cursor,
+        'feed': feed,
+        'key': key,
+        'hide_group': feed == 'group',
+        'hide_author': feed == 'profile',
+    }
+    return render(request, 'includes/feed_fragment.html', context)
+
+
+@query_budget(5)
+@login_required
+def group_subscribe(request, slug):
+    group = get_object_or_404(Group, slug=slug, pending_deletion=False)
+    GroupSubscription.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug=slug)
+
+
+@query_budget(4)
+@login_required
+def group_unsubscribe(request, slug):
+    GroupSubscription.objects.filter(
+        user=request.user, group__slug=slug
+    ).delete()
+    return redirect('posts:group_list', slug=slug)
+
+
+@query_budget(7)
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -136,9 +462,17 @@ def profile_follow(request, username):
     return redirect('posts:profile', username=username)
 
 
+@query_budget(5)
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
         Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+@require_safe
+def sitemap(request, path=sitemaps.INDEX_FILE):
+    """Отдаёт готовые файлы карты сайта, собранные build_sitemaps."""
+    full_path, stat = media.resolve(path, sitemaps.output_dir())
+    return media.serve(request, path, full_path, stat, sitemaps.SERVE_OPTIONS)
@@ -1,4 +1,5 @@
 import os
+import sys
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -8,6 +9,9 @@ SECRET_KEY = 'i*dgff8^2k1oxd_)8t#wey9*ltis1%fbi_o5fry4%4f)*o_@-b'
 
 DEBUG = True
 
+# Запущены ли тесты: manage.py test или pytest.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
@@ -39,6 +43,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Старые сессии, созданные через ModelBackend, остаются рабочими.
+AUTHENTICATION_BACKENDS = [
+    'posts.backends.FeedMarkerBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -54,7 +64,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'core.context_processors.year.year'
+                'core.context_processors.year.year',
+                'posts.context_processors.unread',
             ],
         },
     },
@@ -92,6 +103,29 @@ CACHES = {
     }
 }
 
+TIERED_CACHE_L1_SIZE = None
+
+FEED_CACHE = {
+    'TIMEOUT': 0 if DEBUG else 20,
+    'STALE_WHILE_REVALIDATE': 0 if DEBUG else 60,
+    'STALE_IF_ERROR': 60 * 60,
+}
+
+# На сколько строк делится счётчик лайков одного поста.
+LIKE_COUNTER_SHARDS = 8
+
+# Как часто процесс записывает накопленные просмотры постов в базу.
+POST_VIEWS = {
+    'FLUSH_INTERVAL': 10,
+    'MAX_PENDING': 1000,
+}
+
+# В тестах превышение бюджета запросов роняет тест, а не пишется в лог.
+QUERY_BUDGET = {
+    'ENABLED': DEBUG or TESTING,
+    'ACTION': 'raise' if TESTING else 'log',
+}
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -118,3 +152,16 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Отдачу медиафайлов можно поручить nginx: 'ACCEL_REDIRECT' — префикс
+# internal-location с alias на MEDIA_ROOT.
+MEDIA_SERVING = {
+    'ACCEL_REDIRECT': None,
+    'SENDFILE': False,
+}
+
+# Карта сайта: каталог с готовыми файлами и адрес сайта для ссылок.
+SITEMAPS = {
+    'ROOT': os.path.join(BASE_DIR, 'sitemaps'),
+    'BASE_URL': 'http://localhost:8000',
+}